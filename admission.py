@@ -0,0 +1,102 @@
+import math
+import random
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from metrics import Counter
+
+# Admission control di depan matching: waktu raid / spam, pesan yang masuk ke grup
+# aktif tidak semuanya diproses.
+#   - rate pesan per chat dilacak sebagai EWMA (pesan/detik, jendela `window` detik)
+#   - di atas sample_rate: cuma sebagian kecil pesan yang diproses (sampling)
+#   - di atas drop_rate  : semua pesan chat itu dibuang sampai rate-nya turun
+#   - antrian kirim (sender.depth) di atas queue_high: semua pesan dibuang (backpressure)
+# Tiap keputusan buang dicatat di counter chatrep_shed_total{reason=...}.
+# depth() antrian kirim dibaca paling sering tiap depth_every detik supaya murah.
+# rates per chat diurut dari yang paling lama tidak ada pesan (seperti CooldownStore):
+# chat sepi dibuang dari depan, dan jumlah chat dibatasi keras max_chats.
+
+SHED = Counter("chatrep_shed_total", "Pesan masuk yang tidak diproses karena load shedding", "reason")
+
+
+class Admission:
+    def __init__(self, sample_rate: float = 2.0, drop_rate: float = 10.0, sample: float = 0.2,
+                 queue_high: int = 200, depth: Optional[Callable[[], int]] = None,
+                 window: float = 10.0, depth_every: float = 0.25, max_chats: int = 50_000,
+                 clock: Callable[[], float] = time.monotonic, rnd: Optional[random.Random] = None):
+        self.sample_rate = sample_rate
+        self.drop_rate = drop_rate
+        self.sample = sample
+        self.queue_high = queue_high
+        self.depth = depth
+        self.window = float(window)
+        self.depth_every = depth_every
+        self.max_chats = max_chats
+        self.clock = clock
+        self.rnd = rnd or random.Random()
+        # chat_id -> [rate, ts], urut ts (pesan terakhir) dari yang paling lama
+        self.rates: "OrderedDict[int, List[float]]" = OrderedDict()
+        self._depth = 0
+        self._depth_at = float("-inf")
+        self.stats = {"admitted": 0, "sampled_out": 0, "flood": 0, "backpressure": 0}
+        self.evictions = 0
+
+    def rate(self, chat_id: int) -> float:
+        entry = self.rates.get(chat_id)
+        if entry is None:
+            return 0.0
+        return entry[0] * math.exp(-(self.clock() - entry[1]) / self.window)
+
+    def _observe(self, chat_id: int, now: float) -> float:
+        rates = self.rates
+        entry = rates.get(chat_id)
+        if entry is None:
+            self._prune(now)
+            rates[chat_id] = entry = [0.0, now]
+        else:
+            rates.move_to_end(chat_id)
+        rate = entry[0] * math.exp(-(now - entry[1]) / self.window) + 1.0 / self.window
+        entry[0], entry[1] = rate, now
+        return rate
+
+    def _prune(self, now: float):
+        # chat yang sudah sepi (rate < 1 pesan per window) dilupakan, dari yang paling lama diam;
+        # berhenti di chat pertama yang masih ramai, jadi O(1) amortized per chat baru
+        rates = self.rates
+        quiet = 1.0 / self.window
+        while rates:
+            r, ts = next(iter(rates.values()))
+            if r * math.exp(-(now - ts) / self.window) >= quiet:
+                break
+            rates.popitem(last=False)
+        # semua chat masih ramai: yang paling lama diam dibuang (batas keras)
+        while len(rates) >= self.max_chats:
+            rates.popitem(last=False)
+            self.evictions += 1
+
+    def _shed(self, reason: str) -> bool:
+        self.stats[reason] += 1
+        SHED.inc(reason)
+        return False
+
+    # True kalau pesan boleh diproses (matching + cooldown + kirim)
+    def admit(self, chat_id: int) -> bool:
+        now = self.clock()
+        rate = self._observe(chat_id, now)
+
+        if self.depth is not None:
+            if now - self._depth_at >= self.depth_every:
+                self._depth = self.depth()
+                self._depth_at = now
+            if self._depth >= self.queue_high:
+                return self._shed("backpressure")
+
+        if rate > self.sample_rate:
+            if rate > self.drop_rate:
+                return self._shed("flood")
+            if self.rnd.random() >= self.sample:
+                return self._shed("sampled_out")
+
+        self.stats["admitted"] += 1
+        return True
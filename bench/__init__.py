@@ -0,0 +1,6 @@
+import os
+
+# main.py / config.py butuh env; benchmark jalan offline, jadi cukup nilai dummy
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "bench")
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:27017")
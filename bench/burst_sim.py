@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import time
+
+from admission import Admission
+from bench.corpus import synthetic_corpus
+from bench.fakes import FakeClient, make_message
+from bench.replay import setup
+from dedup import RecentMessages
+from sender import SendScheduler
+import main
+
+# Simulasi raid: beberapa grup aktif dibanjiri pesan (real time, asyncio), sementara
+# grup lain jalan normal. Dibandingkan tanpa dan dengan admission control:
+# kedalaman antrian kirim, pesan yang sampai ke matching, dan keputusan shedding.
+
+TICK = 0.01
+
+
+def reset(client: FakeClient, admission: bool):
+    acc = main.ACCOUNT
+    acc.last_sent._last.clear()
+    acc.recent = RecentMessages(main.DEDUP_CAPACITY)
+    acc.rotations._bags.clear()
+    acc.sender = SendScheduler(
+        client,
+        chat_rate=main.SEND_CHAT_RATE, chat_burst=main.SEND_CHAT_BURST,
+        global_rate=main.SEND_GLOBAL_RATE, global_burst=main.SEND_GLOBAL_BURST,
+        max_age=main.SEND_MAX_AGE, max_pending_per_chat=main.SEND_MAX_PENDING_PER_CHAT,
+        log=lambda *_a, **_k: None,
+    )
+    if admission:
+        acc.admission = Admission(
+            sample_rate=main.ADMIT_SAMPLE_RATE, drop_rate=main.ADMIT_DROP_RATE, sample=main.ADMIT_SAMPLE,
+            queue_high=main.ADMIT_QUEUE_HIGH, depth=acc.sender.depth, window=main.ADMIT_WINDOW,
+        )
+    else:
+        inf = float("inf")
+        acc.admission = Admission(sample_rate=inf, drop_rate=inf, depth=None)
+
+
+async def run(client: FakeClient, texts, seconds: float, normal_chats: int, raid_chats: int,
+              normal_rate: float, raid_rate: float, admission: bool):
+    reset(client, admission)
+    acc = main.ACCOUNT
+    matched_before = sum(main.metrics.TRIGGER_MATCHES.values.values())
+    rates = [(c, normal_rate) for c in range(normal_chats)]
+    rates += [(c, raid_rate) for c in range(normal_chats, normal_chats + raid_chats)]
+    owed = [0.0] * len(rates)
+
+    msg_id = 0
+    incoming = 0
+    depth_samples = []
+    work = 0.0
+    t_end = time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        t0 = time.perf_counter()
+        for i, (chat, rate) in enumerate(rates):
+            owed[i] += rate * TICK
+            while owed[i] >= 1:
+                owed[i] -= 1
+                msg_id += 1
+                incoming += 1
+                await main.chatrep_handler(client, make_message(chat, texts[msg_id % len(texts)], msg_id))
+        work += time.perf_counter() - t0
+        depth_samples.append(acc.sender.depth())
+        await asyncio.sleep(TICK)
+
+    st = acc.sender.stats
+    matched = sum(main.metrics.TRIGGER_MATCHES.values.values()) - matched_before
+    shed = {k: v for k, v in acc.admission.stats.items() if k != "admitted"}
+    await acc.sender.close()
+    print(f"admission={'on ' if admission else 'off'} incoming={incoming} matched={matched} "
+          f"handler_cpu={work:.2f}s")
+    print(f"  queue depth   : max={max(depth_samples)} last={depth_samples[-1]} "
+          f"avg={sum(depth_samples) / len(depth_samples):.1f}")
+    print(f"  sender        : sent={st['sent']} dropped_overflow={st['dropped_overflow']} "
+          f"dropped_stale={st['dropped_stale']}")
+    print(f"  shed          : {shed}")
+    return max(depth_samples)
+
+
+async def simulate(args):
+    chats = args.normal_chats + args.raid_chats
+    client = await setup(range(chats), enabled_ratio=1.0)
+    texts = synthetic_corpus(main.CHATREP_RULES, 20_000)
+    kw = dict(seconds=args.seconds, normal_chats=args.normal_chats, raid_chats=args.raid_chats,
+              normal_rate=args.normal_rate, raid_rate=args.raid_rate)
+    off = await run(client, texts, admission=False, **kw)
+    on = await run(client, texts, admission=True, **kw)
+    limit = main.ADMIT_QUEUE_HIGH
+    print(f"max depth: off={off} on={on} (ADMIT_QUEUE_HIGH={limit})")
+    if on > limit + args.raid_rate * args.raid_chats:
+        raise SystemExit("antrian kirim tidak terbatas dengan admission on")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Simulasi burst pesan dengan / tanpa admission control")
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--normal-chats", type=int, default=50)
+    ap.add_argument("--raid-chats", type=int, default=5)
+    ap.add_argument("--normal-rate", type=float, default=0.5, help="pesan/detik per grup normal")
+    ap.add_argument("--raid-rate", type=float, default=300, help="pesan/detik per grup yang di-raid")
+    asyncio.run(simulate(ap.parse_args()))
@@ -0,0 +1,46 @@
+import random
+import sys
+import tracemalloc
+
+from cooldown import CooldownStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def soak(messages: int = 3_000_000, chats: int = 2000, triggers: int = 520,
+         ttl: float = 6, max_keys: int = 50_000, msg_per_sec: float = 2000):
+    rnd = random.Random(3)
+    clock = FakeClock()
+    store = CooldownStore(ttl, max_keys=max_keys, clock=clock)
+    step = 1.0 / msg_per_sec
+    report_every = messages // 10
+
+    tracemalloc.start()
+    samples = []
+    for i in range(1, messages + 1):
+        clock.now += step
+        store.claim((rnd.randrange(chats), rnd.randrange(triggers)))
+        if i % report_every == 0:
+            cur, _peak = tracemalloc.get_traced_memory()
+            samples.append(cur)
+            st = store.stats()
+            print(f"{i:>9} msgs  mem={cur / 1024:8.1f} KiB  live={st['live']:>6}  "
+                  f"expired={st['expired']:>8}  evictions={st['evictions']}")
+    tracemalloc.stop()
+
+    # setelah warmup (sample pertama) memori harus datar
+    warm = samples[1:]
+    growth = (max(warm) - min(warm)) / max(warm)
+    print(f"memory spread after warmup: {growth * 100:.1f}%")
+    if growth > 0.10:
+        raise SystemExit("memory keeps growing")
+
+
+if __name__ == "__main__":
+    soak(int(sys.argv[1]) if len(sys.argv) > 1 else 3_000_000)
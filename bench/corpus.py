@@ -0,0 +1,31 @@
+import random
+from typing import List
+
+FILLER = [
+    "gw", "lu", "tadi", "abis", "makan", "nasi", "goreng", "mau", "ke", "pasar", "nanti", "sore",
+    "hujan", "deres", "banget", "disini", "temen", "kantor", "rapat", "motor", "mogok", "bensin",
+    "habis", "coba", "liat", "dulu", "beneran", "ga", "tau", "deh", "yang", "itu", "ini", "sama",
+    "pakai", "abot", "kemarin", "besok", "minggu", "depan", "kerja", "lembur", "capek", "hp", "lowbat",
+]
+
+
+def synthetic_corpus(rules, n: int = 20000, seed: int = 1) -> List[str]:
+    """Pesan grup sintetis: campuran kata filler dan (kadang) trigger dari rules."""
+    rnd = random.Random(seed)
+    triggers = [r[0] for r in rules]
+    out = []
+    for _ in range(n):
+        words = [rnd.choice(FILLER) for _ in range(rnd.randint(1, 14))]
+        roll = rnd.random()
+        if roll < 0.35:
+            words.insert(rnd.randint(0, len(words)), rnd.choice(triggers))
+        elif roll < 0.45:
+            words = [rnd.choice(triggers)]
+        text = " ".join(words)
+        if rnd.random() < 0.1:
+            # ketikan panjang: "haiii", "pppp"
+            text += text[-1] * rnd.randint(2, 4)
+        if rnd.random() < 0.2:
+            text = text.upper()
+        out.append(text)
+    return out
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import random
+
+from bench.corpus import synthetic_corpus
+from bench.fakes import make_message
+from bench.replay import setup
+from dedup import RecentMessages
+import main
+
+# Replay stream update yang berisi duplikat, seperti setelah reconnect atau retry peer:
+#   - sebagian pesan dikirim ulang beberapa saat kemudian (setelah cooldown lewat)
+#   - sesekali satu blok pesan terakhir diputar ulang utuh (gap recovery)
+# Dengan dedup, balasan yang dikirim harus sama persis dengan stream tanpa duplikat,
+# dan semua duplikat yang disisipkan harus tercatat.
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def with_duplicates(messages, rnd: random.Random, dup_ratio: float, block: int):
+    out = []
+    injected = []
+    for i, m in enumerate(messages):
+        out.append(m)
+        if rnd.random() < dup_ratio:
+            # duplikat telat: muncul lagi setelah beberapa pesan lain
+            injected.append(messages[max(0, i - rnd.randint(0, 50))])
+            out.append(injected[-1])
+        if block and i and i % 1000 == 0:
+            injected += messages[i - block + 1:i + 1]
+            out.extend(messages[i - block + 1:i + 1])
+    return out, injected
+
+
+async def play(client, stream, dedup: bool):
+    acc = main.ACCOUNT
+    clock = FakeClock()
+    acc.last_sent.clock = clock
+    acc.last_sent._last.clear()
+    acc.rotations._bags.clear()
+    acc.recent = RecentMessages(main.DEDUP_CAPACITY)
+    if not dedup:
+        acc.recent.seen = lambda _chat_id, _msg_id: False
+    acc.sender.delayed.clear()
+    before_dup = acc.recent.duplicates
+    replies = 0
+    for m in stream:
+        # tiap pesan maju 1 detik: cooldown (COOLDOWN_SECONDS) sudah lewat waktu duplikatnya datang
+        clock.now += 1.0
+        depth = len(acc.sender.delayed)
+        await main.chatrep_handler(client, m)
+        replies += len(acc.sender.delayed) - depth
+    acc.sender.delayed.clear()
+    return replies, acc.recent.duplicates - before_dup
+
+
+async def run(args):
+    texts = synthetic_corpus(main.CHATREP_RULES, args.n)
+    corpus = [(i % args.chats, t) for i, t in enumerate(texts)]
+    client = await setup(c for c, _t in corpus)
+    messages = [make_message(c, t, i) for i, (c, t) in enumerate(corpus)]
+    stream, injected = with_duplicates(messages, random.Random(11), args.dup_ratio, args.block)
+
+    clean, _ = await play(client, messages, dedup=True)
+    deduped, caught = await play(client, stream, dedup=True)
+    raw, _ = await play(client, stream, dedup=False)
+
+    # dedup cuma jalan untuk grup aktif (grup OFF sudah dibuang sebelumnya)
+    active = main.ACCOUNT.active_chat_ids
+    expected = sum(1 for m in injected if m.chat.id in active)
+    print(f"messages={len(messages)} stream={len(stream)} injected duplicates={len(injected)} "
+          f"(in active chats={expected})")
+    print(f"replies: clean stream={clean}  duplicate stream + dedup={deduped}  without dedup={raw}")
+    print(f"duplicates caught={caught}")
+    if deduped != clean or caught != expected:
+        raise SystemExit("dedup gagal: balasan / jumlah duplikat tidak sesuai")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Replay stream update dengan duplikat")
+    ap.add_argument("-n", type=int, default=20_000)
+    ap.add_argument("--chats", type=int, default=200)
+    ap.add_argument("--dup-ratio", type=float, default=0.05)
+    ap.add_argument("--block", type=int, default=100, help="ukuran blok yang diputar ulang tiap 1000 pesan")
+    asyncio.run(run(ap.parse_args()))
@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from pyrogram.enums import ChatType
+from pymongo.errors import BulkWriteError, OperationFailure
+
+
+class FakeClient:
+    # pengganti pyrogram Client: cuma mencatat pesan yang dikirim
+    # name sama dengan akun default supaya handler menemukan Account-nya
+    def __init__(self, latency: float = 0.0, name: str = "chatrep_userbot"):
+        self.name = name
+        self.latency = latency
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_to_message_id=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append((chat_id, text, reply_to_message_id))
+
+
+def make_message(chat_id: int, text: str, msg_id: int, date: float | None = None):
+    chat = SimpleNamespace(id=chat_id, type=ChatType.SUPERGROUP, title=f"bench {chat_id}")
+    return SimpleNamespace(
+        id=msg_id, chat=chat, text=text, outgoing=False,
+        date=datetime.fromtimestamp(time.time() if date is None else date),
+    )
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    return all(doc.get(k) == v for k, v in query.items())
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    # pengganti collection Motor di memori; cukup untuk query equality yang dipakai main.py
+    def __init__(self, docs=()):
+        self._ids = itertools.count(1)
+        self.docs = {}
+        for d in docs:
+            d = dict(d)
+            d.setdefault("_id", next(self._ids))
+            self.docs[d["_id"]] = d
+        self.ops = 0
+
+    def find(self, query=None, projection=None):
+        self.ops += 1
+        hits = [d for d in self.docs.values() if _matches(d, query or {})]
+        if projection:
+            keep = [k for k, v in projection.items() if v]
+            hits = [{k: d[k] for k in keep if k in d} for d in hits]
+        return _Cursor(hits)
+
+    async def find_one(self, query, projection=None):
+        async for doc in self.find(query, projection):
+            return doc
+        return None
+
+    async def count_documents(self, query, limit=0):
+        self.ops += 1
+        n = sum(1 for d in self.docs.values() if _matches(d, query))
+        return min(n, limit) if limit else n
+
+    async def insert_many(self, docs, ordered=True):
+        self.ops += 1
+        errors, inserted = [], 0
+        for i, d in enumerate(docs):
+            d.setdefault("_id", next(self._ids))
+            if d["_id"] in self.docs:
+                errors.append({"index": i, "code": 11000, "errmsg": f"E11000 duplicate key _id={d['_id']!r}"})
+                if ordered:
+                    break
+                continue
+            self.docs[d["_id"]] = dict(d)
+            inserted += 1
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": inserted})
+
+    async def update_one(self, query, update, upsert=False):
+        self.ops += 1
+        self._update(query, update, upsert)
+
+    def _update(self, query, update, upsert):
+        for d in self.docs.values():
+            if _matches(d, query):
+                d.update(update.get("$set", {}))
+                return
+        if upsert:
+            d = {**query, **update.get("$set", {}), "_id": next(self._ids)}
+            self.docs[d["_id"]] = d
+
+    async def bulk_write(self, ops, ordered=True):
+        self.ops += 1
+        for op in ops:  # pymongo UpdateOne
+            self._update(op._filter, op._doc, op._upsert)
+
+    def watch(self, *args, **kwargs):
+        # mongod standalone: change stream tidak ada -> RuleStore fallback ke polling
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
@@ -0,0 +1,53 @@
+import asyncio
+import random
+import sys
+import time
+
+from pyrogram.errors import FloodWait
+
+from sender import SendScheduler
+
+
+class FakeClient:
+    # send_message palsu: latency kecil, sesekali FloodWait untuk chat tertentu
+    def __init__(self, flood_chats, flood_prob: float = 0.2, flood_seconds: int = 1, seed: int = 7):
+        self.rnd = random.Random(seed)
+        self.flood_chats = set(flood_chats)
+        self.flood_prob = flood_prob
+        self.flood_seconds = flood_seconds
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_to_message_id=None):
+        await asyncio.sleep(0.002)
+        if chat_id in self.flood_chats and self.rnd.random() < self.flood_prob:
+            raise FloodWait(value=self.flood_seconds)
+        self.sent.append((time.time(), chat_id))
+
+
+async def simulate(chats: int = 50, per_chat: int = 6, max_age: float = 4):
+    client = FakeClient(flood_chats=range(5))
+    sched = SendScheduler(client, chat_rate=2, chat_burst=2, global_rate=100, global_burst=20,
+                          max_age=max_age, max_pending_per_chat=4, log=lambda *_a, **_k: None)
+    t0 = time.time()
+    for i in range(per_chat):
+        for chat in range(chats):
+            sched.submit(chat, f"reply {i}", reply_to=i, msg_time=time.time())
+        await asyncio.sleep(0.05)
+    peak = sched.depth()
+    while sched.tasks:
+        await asyncio.sleep(0.05)
+    elapsed = time.time() - t0
+
+    st = sched.stats
+    flooded = {c for _t, c in client.sent if c < 5}
+    print(f"chats={chats} submitted={chats * per_chat} elapsed={elapsed:.2f}s depth_after_submit={peak}")
+    print(f"sent={st['sent']} dropped_stale={st['dropped_stale']} dropped_overflow={st['dropped_overflow']}")
+    print(f"floodwaits={st['floodwaits']} floodwait_seconds={st['floodwait_seconds']} "
+          f"wait_avg={st['wait_total'] / max(st['sent'], 1):.3f}s wait_max={st['wait_max']:.3f}s")
+    # chat lain tidak ikut tertahan oleh FloodWait di chat 0..4
+    clean = [t - t0 for t, c in client.sent if c >= 5]
+    print(f"last send in non-flooded chats at {max(clean):.2f}s; flooded chats still served: {len(flooded)}/5")
+
+
+if __name__ == "__main__":
+    asyncio.run(simulate(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import random
+import sys
+import time
+
+from bench.corpus import synthetic_corpus
+from bench.fakes import FakeClient, make_message
+from dedup import RecentMessages
+from logpipe import ERROR
+import main
+
+# Simulasi dispatcher pyrogram: WORKERS coroutine mengambil update dari satu antrian
+# dan memanggil chatrep_handler. "inline sleep" = perilaku lama (sleep jeda manusia di handler),
+# "delay queue" = jeda diserahkan ke timer SENDER.
+WORKERS = min(32, (os.cpu_count() or 0) + 4)  # default workers pyrogram
+
+
+async def legacy_handler(client, m):
+    # perilaku lama: kalau handler menjadwalkan balasan, slot worker ikut tertahan selama jeda
+    before = len(main.ACCOUNT.sender.delayed)
+    await main.chatrep_handler(client, m)
+    if len(main.ACCOUNT.sender.delayed) > before:
+        await asyncio.sleep(random.uniform(*main.HUMAN_DELAY_RANGE))
+
+
+async def run(handler, messages, chats: int):
+    main.ACCOUNT.active_chat_ids.clear()
+    main.ACCOUNT.active_chat_ids.update(range(chats))
+    main.ACCOUNT.last_sent._last.clear()
+    main.ACCOUNT.recent = RecentMessages(main.DEDUP_CAPACITY)
+    client = FakeClient()
+    main.ACCOUNT.sender.client = client
+    queue: asyncio.Queue = asyncio.Queue()
+    for i, text in enumerate(messages):
+        queue.put_nowait(make_message(i % chats, text, i))
+
+    async def worker():
+        while True:
+            try:
+                m = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await handler(client, m)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(WORKERS)))
+    elapsed = time.perf_counter() - t0
+    await main.ACCOUNT.sender.close()
+    main.ACCOUNT.sender.delayed.clear()
+    main.ACCOUNT.sender.queues.clear()
+    return elapsed
+
+
+async def bench(n: int = 300, chats: int = 500):
+    main.LOG.level = ERROR
+    main.FIRST_MESSAGE_LOGGED = True
+    messages = synthetic_corpus(main.RULES.matcher.rules, n)
+    for name, handler in (("inline sleep", legacy_handler), ("delay queue", main.chatrep_handler)):
+        elapsed = await run(handler, messages, chats)
+        print(f"{name:<13}: {n / elapsed:10.0f} msg/s  ({elapsed:.2f}s, workers={WORKERS})")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
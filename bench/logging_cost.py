@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+import time
+
+from admission import Admission
+from bench.corpus import synthetic_corpus
+from bench.fakes import FakeClient, make_message
+from dedup import RecentMessages
+from logpipe import DEBUG, ERROR, LogPipe
+import main
+
+
+class SlowStream:
+    # stdout yang lambat (pipe penuh / terminal / journald): tiap write makan waktu
+    def __init__(self, delay: float = 50e-6):
+        self.delay = delay
+
+    def write(self, _text):
+        time.sleep(self.delay)
+
+    def flush(self):
+        pass
+
+
+class PrintLog:
+    # perilaku lama: f-string + print sinkron di event loop untuk tiap event
+    def __init__(self, stream):
+        self.stream = stream
+
+    def log(self, _level, category, msg="", **fields):
+        text = " ".join([f"[{category}]", msg] + [f"{k}={v!r}" for k, v in fields.items()])
+        print(text, file=self.stream)
+
+    def debug(self, category, msg="", **fields):
+        self.log(DEBUG, category, msg, **fields)
+
+    info = warn = error = debug
+
+
+async def handler_cost(messages, client, rounds: int = 3) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        main.ACCOUNT.last_sent._last.clear()
+        main.ACCOUNT.recent = RecentMessages(main.DEDUP_CAPACITY)
+        t0 = time.perf_counter()
+        for m in messages:
+            await main.chatrep_handler(client, m)
+        best = min(best, time.perf_counter() - t0)
+        main.ACCOUNT.sender.delayed.clear()
+    return best / len(messages)
+
+
+async def bench(n: int = 20000, chats: int = 2000):
+    devnull = open(os.devnull, "w")
+    client = FakeClient()
+    main.ACCOUNT.sender.client = client
+    main.ACCOUNT.active_chat_ids.update(range(chats))
+    main.FIRST_MESSAGE_LOGGED = True
+    # tiap round memutar pesan yang sama dalam waktu singkat: admission dimatikan
+    main.ACCOUNT.admission = Admission(sample_rate=float("inf"), drop_rate=float("inf"))
+    texts = synthetic_corpus(main.RULES.matcher.rules, n)
+    messages = [make_message(i % chats, t, i) for i, t in enumerate(texts)]
+
+    setups = [
+        ("off (level ERROR)", LogPipe(level=ERROR, stream=devnull)),
+        ("debug, IN 1%", LogPipe(level=DEBUG, sample={"IN": 0.01}, stream=devnull)),
+        ("debug, all", LogPipe(level=DEBUG, stream=devnull, max_queue=10 * n)),
+        ("debug, all, json", LogPipe(level=DEBUG, json_output=True, stream=devnull, max_queue=10 * n)),
+        ("old print dlog", PrintLog(devnull)),
+        ("slow stdout, pipe", LogPipe(level=DEBUG, stream=SlowStream(), max_queue=10 * n)),
+        ("slow stdout, print", PrintLog(SlowStream())),
+    ]
+    for name, log in setups:
+        main.LOG = log
+        cost = await handler_cost(messages, client)
+        if isinstance(log, LogPipe):
+            log.close()
+        print(f"{name:<18}: {cost * 1e6:7.2f} us/msg")
+    await main.ACCOUNT.sender.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
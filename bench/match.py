@@ -0,0 +1,101 @@
+import random
+import re
+import sys
+import time
+
+from bench.corpus import synthetic_corpus
+from matcher import RuleMatcher, words
+import main
+
+# contoh rule regex untuk benchmark, disisipkan di beberapa posisi rules
+REGEX_RULES = [
+    (r"\bjam\s*\d{1,2}([:.]\d{2})?\b", "jam segitu kak", "regex"),
+    (r"\b(wa|wha?tsapp?)\s*\+?\d{8,}", "jangan share nomor kak", "regex"),
+    (r"\bharga\s+\d+\s*(k|rb|ribu)\b", "murah itu", "regex"),
+    (r"(https?://|t\.me/)\S+", "link apaan tuh", "regex"),
+    (r"\b(\d{1,3}(?:[.,]\d{3})+)\s*(rupiah|rp)\b", "mahal kak", "regex"),
+]
+REGEX_SAMPLES = ["jam 12", "jam 7.30", "wa 0812345678", "harga 50 rb", "t.me/joinchat", "100.000 rupiah"]
+
+
+def old_normalize(text: str) -> str:
+    # normalize sebelum MessageView (lower, bukan casefold), supaya baseline tetap baseline
+    return (text or "").strip().lower()
+
+
+def old_match(mode: str, trigger: str, incoming: str) -> bool:
+    # match() lama di main.py dengan old_normalize: dipanggil per rule, trigger & pesan di-normalize ulang tiap kali
+    mode = str(mode or "contains").lower()
+    t = old_normalize(trigger)
+    inc = old_normalize(incoming)
+    if not t or not inc:
+        return False
+    if mode == "exact":
+        return inc == t
+    if mode == "word":
+        tw, iw = words(t), words(inc)
+        n = len(tw)
+        return n > 0 and any(iw[i:i + n] == tw for i in range(len(iw) - n + 1))
+    if mode == "regex":
+        try:
+            return re.search(trigger.strip(), inc, re.IGNORECASE) is not None
+        except re.error:
+            return False
+    return t in inc
+
+
+def linear_find(rules, incoming: str):
+    # loop lama di chatrep_handler (referensi)
+    for rule in rules:
+        if old_match(rule[2], rule[0], incoming):
+            return rule
+    return None
+
+
+def run(fn, corpus, rounds: int):
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(corpus)
+
+
+def with_regex(rules, corpus, seed: int = 1):
+    rnd = random.Random(seed)
+    rules = list(rules)
+    step = max(1, len(rules) // (len(REGEX_RULES) + 1))
+    for i, rule in enumerate(REGEX_RULES):
+        rules.insert((i + 1) * step, rule)
+    corpus = [f"{t} {rnd.choice(REGEX_SAMPLES)}" if rnd.random() < 0.05 else t for t in corpus]
+    return rules, corpus
+
+
+def main_bench(n: int = 20000, rounds: int = 3):
+    rules, corpus = with_regex(main.RULES.matcher.rules, synthetic_corpus(main.RULES.matcher.rules, n))
+    matcher = RuleMatcher(rules)
+    modes = {}
+    for rule in matcher.rules:
+        modes[str(rule.mode)] = modes.get(str(rule.mode), 0) + 1
+
+    # yang match di loop lama harus sama persis; sisanya boleh match lewat teks collapsed
+    mismatch = extra = 0
+    for text in corpus:
+        old, new = linear_find(rules, text), matcher.find(text)
+        if old is not None and old[0] != new.trigger:
+            mismatch += 1
+        elif old is None and new is not None:
+            extra += 1
+    if mismatch:
+        raise SystemExit(f"hasil beda dengan loop lama: {mismatch} pesan")
+
+    old = run(lambda t: linear_find(rules, t), corpus, rounds)
+    new = run(matcher.find, corpus, rounds)
+    print(f"rules={len(rules)} modes={modes} messages={len(corpus)} extra matches via collapsed text={extra}")
+    print(f"linear loop : {old * 1e6:8.2f} us/msg")
+    print(f"compiled    : {new * 1e6:8.2f} us/msg  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import random
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from indexes import check_hot_queries, ensure_indexes, explain_stages, hot_queries
+from settings_writer import SettingsWriter
+
+# Benchmark query chatrep_settings di mongod lokal (bukan Motor palsu), tanpa vs dengan
+# index dari indexes.py:
+#   - preload grup aktif (find enabled=True per akun, seperti Account.reload_enabled)
+#   - flush SettingsWriter (bulk upsert per (account, chat_id), seperti .on / .off)
+#   - upsert tunggal (latency p50/p99)
+# Database --db di-drop di awal dan akhir; jangan arahkan ke database produksi.
+#
+#   python -m bench.mongo_indexes --url mongodb://127.0.0.1:27017 --docs 200000
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))]
+
+
+async def seed(col, docs: int, accounts, enabled_ratio: float, rnd: random.Random):
+    batch = []
+    for i in range(docs):
+        batch.append({"account": accounts[i % len(accounts)], "chat_id": -1001000000000 - i,
+                      "enabled": rnd.random() < enabled_ratio})
+        if len(batch) == 10_000:
+            await col.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await col.insert_many(batch, ordered=False)
+
+
+async def measure(db, col, args, accounts, rnd: random.Random, label: str):
+    t0 = time.perf_counter()
+    active = 0
+    for key in accounts:
+        async for _doc in col.find({"account": key, "enabled": True}, {"_id": 0, "chat_id": 1, "rules": 1}):
+            active += 1
+    preload = time.perf_counter() - t0
+
+    # writer tidak di-start: flush hanya dari sini
+    writer = SettingsWriter(col, max_batch=args.batch + 1, log=lambda *_a, **_k: None)
+    t0 = time.perf_counter()
+    for _ in range(args.flushes):
+        for _ in range(args.batch):
+            chat_id = -1001000000000 - rnd.randrange(args.docs)
+            writer.put(chat_id, {"enabled": rnd.random() < 0.5}, account=rnd.choice(accounts))
+        await writer.flush()
+    flush = (time.perf_counter() - t0) / args.flushes
+
+    lat = []
+    for _ in range(args.upserts):
+        key, chat_id = rnd.choice(accounts), -1001000000000 - rnd.randrange(args.docs)
+        t = time.perf_counter()
+        await col.update_one({"account": key, "chat_id": chat_id},
+                             {"$set": {"account": key, "chat_id": chat_id, "enabled": True}}, upsert=True)
+        lat.append(time.perf_counter() - t)
+
+    print(f"{label}: preload={preload * 1000:.0f}ms ({active} active) "
+          f"flush({args.batch})={flush * 1000:.1f}ms "
+          f"upsert p50={pct(lat, 0.5) * 1000:.2f}ms p99={pct(lat, 0.99) * 1000:.2f}ms")
+    for collection, query in hot_queries(accounts[:1])[:2]:
+        print(f"  {collection} {query}: {' <- '.join(await explain_stages(db, collection, query))}")
+    return preload, flush
+
+
+async def run(args):
+    client = AsyncIOMotorClient(args.url, serverSelectionTimeoutMS=5000)
+    await client.admin.command("ping")
+    await client.drop_database(args.db)
+    db = client[args.db]
+    col = db["chatrep_settings"]
+    accounts = [None] + [f"acc{i}" for i in range(1, args.accounts)]
+    rnd = random.Random(5)
+    try:
+        t0 = time.perf_counter()
+        await seed(col, args.docs, accounts, args.enabled, rnd)
+        await db["chatrep_peers"].insert_one({"account": None, "peer_id": 1})
+        print(f"seeded {args.docs} docs / {len(accounts)} accounts in {time.perf_counter() - t0:.1f}s")
+
+        before = await measure(db, col, args, accounts, random.Random(7), "no index")
+        await ensure_indexes(db)
+        after = await measure(db, col, args, accounts, random.Random(7), "indexed ")
+        await check_hot_queries(db, hot_queries(accounts))
+
+        print(f"speedup: preload x{before[0] / after[0]:.1f}  flush x{before[1] / after[1]:.1f}")
+        if after[1] > before[1]:
+            raise SystemExit("flush dengan index tidak lebih cepat")
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark index chatrep_settings di mongod lokal")
+    ap.add_argument("--url", default="mongodb://127.0.0.1:27017")
+    ap.add_argument("--db", default="chatrep_bench_indexes")
+    ap.add_argument("--docs", type=int, default=100_000)
+    ap.add_argument("--accounts", type=int, default=4)
+    ap.add_argument("--enabled", type=float, default=0.05, help="rasio grup aktif")
+    ap.add_argument("--batch", type=int, default=100, help="chat per flush SettingsWriter")
+    ap.add_argument("--flushes", type=int, default=20)
+    ap.add_argument("--upserts", type=int, default=500)
+    asyncio.run(run(ap.parse_args()))
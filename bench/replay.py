@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Tuple
+
+from admission import Admission
+from bench.corpus import synthetic_corpus
+from bench.fakes import FakeClient, FakeCollection, make_message
+from dedup import RecentMessages
+from logpipe import ERROR
+import main
+import metrics
+
+# Replay corpus pesan grup lewat chatrep_handler secara offline:
+# Client/Message palsu + collection Motor in-memory, lalu laporkan throughput,
+# latency p50/p99, alokasi per pesan dan distribusi match.
+#
+# Format corpus (--corpus): JSONL {"chat_id": int, "text": str} per baris,
+# atau teks biasa (satu pesan per baris, chat dibagi rata).
+
+
+def load_corpus(path: str, chats: int) -> List[Tuple[int, str]]:
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            if line.startswith("{"):
+                rec = json.loads(line)
+                out.append((int(rec["chat_id"]), str(rec.get("text") or "")))
+            else:
+                out.append((i % chats, line))
+    return out
+
+
+async def setup(chat_ids, enabled_ratio: float = 0.9) -> FakeClient:
+    main.LOG.level = ERROR
+    main.FIRST_MESSAGE_LOGGED = True
+    chat_ids = sorted(set(chat_ids))
+    cut = int(len(chat_ids) * enabled_ratio)
+    settings = FakeCollection(
+        {"chat_id": c, "enabled": i < cut} for i, c in enumerate(chat_ids)
+    )
+    main.col = main.SETTINGS_WRITER.col = settings
+    main.rules_col = main.RULES.col = FakeCollection()
+    main.ACCOUNT.db_loaded = False
+    await asyncio.gather(main.ACCOUNT.ensure_db_loaded(), main.RULES.load())
+
+    client = FakeClient()
+    main.ACCOUNT.sender.client = client
+    # corpus diputar jauh lebih cepat dari real time, rate per chat-nya tidak realistis:
+    # admission dimatikan supaya yang diukur tetap jalur handler penuh
+    main.ACCOUNT.admission = Admission(sample_rate=float("inf"), drop_rate=float("inf"))
+    return client
+
+
+def pct(sorted_vals, p: float) -> float:
+    return sorted_vals[min(len(sorted_vals) - 1, int(len(sorted_vals) * p))]
+
+
+async def replay(corpus: List[Tuple[int, str]], alloc_sample: int = 2000):
+    client = await setup(c for c, _t in corpus)
+    messages = [make_message(c, t, i) for i, (c, t) in enumerate(corpus)]
+    matches_before = dict(metrics.TRIGGER_MATCHES.values)
+    cooldown_before = sum(metrics.TRIGGER_COOLDOWNS.values.values())
+
+    handler = main.chatrep_handler
+    lat = []
+    perf = time.perf_counter
+    t_start = perf()
+    for m in messages:
+        t0 = perf()
+        await handler(client, m)
+        lat.append(perf() - t0)
+    elapsed = perf() - t_start
+    dist = Counter({k: v - matches_before.get(k, 0) for k, v in metrics.TRIGGER_MATCHES.values.items()})
+    suppressed = sum(metrics.TRIGGER_COOLDOWNS.values.values()) - cooldown_before
+    queued = main.ACCOUNT.sender.depth() + main.ACCOUNT.sender.stats["sent"]
+
+    # alokasi: pass terpisah (tracemalloc memperlambat), puncak memori per pesan di atas baseline
+    main.ACCOUNT.last_sent._last.clear()
+    main.ACCOUNT.recent = RecentMessages(main.DEDUP_CAPACITY)
+    sample = messages[:alloc_sample]
+    tracemalloc.start()
+    alloc_total = 0
+    for m in sample:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await handler(client, m)
+        _, peak = tracemalloc.get_traced_memory()
+        alloc_total += peak - base
+    tracemalloc.stop()
+
+    await main.ACCOUNT.sender.close()
+
+    lat.sort()
+    matched = sum(dist.values())
+    print(f"messages      : {len(messages)}  (chats={len({c for c, _ in corpus})}, "
+          f"enabled={len(main.ACCOUNT.active_chat_ids)})")
+    print(f"throughput    : {len(messages) / elapsed:,.0f} msg/s")
+    print(f"handler p50   : {pct(lat, 0.50) * 1e6:.1f} us   p99: {pct(lat, 0.99) * 1e6:.1f} us   "
+          f"max: {lat[-1] * 1e6:.1f} us")
+    print(f"alloc/msg     : {alloc_total / max(len(sample), 1):,.0f} B peak over baseline "
+          f"(sample {len(sample)})")
+    print(f"matched       : {matched} ({matched / len(messages) * 100:.1f}%), "
+          f"cooldown-suppressed: {suppressed}, replies queued: {queued}")
+    print("top triggers  : " + ", ".join(f"{k}={v}" for k, v in dist.most_common(10)))
+
+
+def cli():
+    ap = argparse.ArgumentParser(description="Replay benchmark untuk chatrep_handler")
+    ap.add_argument("--corpus", help="file JSONL / teks; default corpus sintetis")
+    ap.add_argument("-n", type=int, default=50_000, help="jumlah pesan sintetis")
+    ap.add_argument("--chats", type=int, default=300)
+    args = ap.parse_args()
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus, args.chats)
+    else:
+        texts = synthetic_corpus(main.CHATREP_RULES, args.n)
+        corpus = [(i % args.chats, t) for i, t in enumerate(texts)]
+    asyncio.run(replay(corpus))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,67 @@
+import random
+import sys
+import time
+import tracemalloc
+
+from matcher import freeze, normalize
+import main
+
+MODES = ("contains", "contains", "contains", "word", "exact")
+
+
+def as_loaded(rules):
+    # bentuk rules lama setelah dibaca dari Mongo: string baru (tidak di-intern), list response
+    return [("".join(t), [("".join(r)) for r in (rs if isinstance(rs, (list, tuple)) else [rs])], "".join(mode))
+            for t, rs, mode in rules]
+
+
+def synthetic_rules(n: int, seed: int = 5):
+    rnd = random.Random(seed)
+    pool = [r for _t, rs, _m in main.CHATREP_RULES for r in (rs if isinstance(rs, (list, tuple)) else [rs])]
+    return [(f"trig{i}x{rnd.randrange(10**6)}", rnd.sample(pool, rnd.randint(2, 5)), rnd.choice(MODES))
+            for i in range(n)]
+
+
+def measure(build):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    table = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return table, after - before
+
+
+def key_cost(raw, frozen, n: int = 500_000):
+    rnd = random.Random(7)
+    picks = [(rnd.randrange(-10**12, -10**12 + 5000), rnd.randrange(len(raw))) for _ in range(n)]
+    d_old, d_new = {}, {}
+    keys = [normalize(t) for t, _r, _m in raw]
+
+    t0 = time.perf_counter()
+    for chat_id, i in picks:
+        d_old[(chat_id, keys[i])] = 1
+    old = time.perf_counter() - t0
+
+    ids = [r.id for r in frozen]
+    t0 = time.perf_counter()
+    for chat_id, i in picks:
+        d_new[(chat_id, ids[i])] = 1
+    new = time.perf_counter() - t0
+    return old / n, new / n
+
+
+def report(name: str, rules):
+    raw, raw_bytes = measure(lambda: as_loaded(rules))
+    source = as_loaded(rules)
+    frozen, frozen_bytes = measure(lambda: tuple(freeze(r) for r in source))
+    old, new = key_cost(raw, frozen)
+    print(f"{name}: {len(rules)} rules")
+    print(f"  list/tuple rules : {raw_bytes / 1024:10.1f} KiB ({raw_bytes / len(rules):6.1f} B/rule)")
+    print(f"  frozen Rule table: {frozen_bytes / 1024:10.1f} KiB ({frozen_bytes / len(rules):6.1f} B/rule)")
+    print(f"  cooldown key     : (chat_id, trigger) {old * 1e9:6.1f} ns  vs (chat_id, rule.id) {new * 1e9:6.1f} ns")
+
+
+if __name__ == "__main__":
+    report("current set", main.CHATREP_RULES)
+    report("synthetic", synthetic_rules(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000))
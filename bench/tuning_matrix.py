@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Sweep EVENT_LOOP x PYRO_WORKERS (x MONGO_POOL_SIZE) atas corpus yang di-replay lewat
+# Dispatcher pyrogram yang asli (worker handler + thread pool filter), bukan langsung ke
+# chatrep_handler seperti bench.replay. Tiap kombinasi jalan di proses baru karena event
+# loop harus dipasang sebelum pyrogram di-import.
+#   - throughput: semua pesan dimasukkan sekaligus ke antrian update, waktu sampai habis
+#   - latency   : pesan masuk dengan rate tetap (--rate), antri -> handler selesai
+# Pool Motor cuma berpengaruh kalau handler bicara ke Mongo: dengan --mongo-url dipakai
+# STATE_BACKEND=mongo (claim cooldown ke mongod itu), tanpa itu dimensi pool dilewati.
+#
+#   python -m bench.tuning_matrix --workers 1,4,8,16 --corpus corpus.jsonl
+#   python -m bench.tuning_matrix --mongo-url mongodb://127.0.0.1:27017 --pools 10,50,100
+
+
+def pct(sorted_vals, p: float) -> float:
+    return sorted_vals[min(len(sorted_vals) - 1, int(len(sorted_vals) * p))]
+
+
+def child(args):
+    import bench  # noqa: F401  env dummy
+    import main  # paling awal: main memasang event loop sebelum pyrogram di-import
+    from pyrogram.handlers import MessageHandler
+    from bench.corpus import synthetic_corpus
+    from bench.fakes import make_message
+    from bench.replay import load_corpus, setup
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus, args.chats)
+    else:
+        texts = synthetic_corpus(main.CHATREP_RULES, args.n)
+        corpus = [(i % args.chats, t) for i, t in enumerate(texts)]
+
+    app = main.app
+    dispatcher = app.dispatcher
+    done = []
+    perf = time.perf_counter
+
+    inner = main.handle_incoming
+
+    async def timed(acc, m):
+        await inner(acc, m)
+        done.append(perf() - m.t_enq)
+    main.handle_incoming = timed
+
+    async def parse(update, _users, _chats):
+        return update, MessageHandler
+
+    async def drain(n: int):
+        while len(done) < n:
+            await asyncio.sleep(0.001)
+
+    async def run():
+        if args.mongo_url:
+            await main.connect_mongo()
+            await main.setup_state()
+        await setup(c for c, _t in corpus)
+        ids = itertools.count(1)
+
+        def messages():
+            out = [make_message(c, t, next(ids)) for c, t in corpus]
+            dispatcher.update_parsers[type(out[0])] = parse
+            return out
+
+        await dispatcher.start()
+
+        # throughput: antrian penuh sejak awal
+        batch = messages()
+        done.clear()
+        t0 = perf()
+        for m in batch:
+            m.t_enq = t0
+            dispatcher.updates_queue.put_nowait((m, {}, {}))
+        await drain(len(batch))
+        throughput = len(batch) / (perf() - t0)
+
+        # latency: rate tetap, dikirim per tick 1ms
+        main.ACCOUNT.last_sent._last.clear()
+        batch = messages()
+        done.clear()
+        t0 = perf()
+        sent = 0
+        while sent < len(batch):
+            due = min(len(batch), int((perf() - t0) * args.rate) + 1)
+            now = perf()
+            for m in batch[sent:due]:
+                m.t_enq = now
+                dispatcher.updates_queue.put_nowait((m, {}, {}))
+            sent = due
+            await asyncio.sleep(0.001)
+        await drain(len(batch))
+        lat = sorted(done)
+
+        await dispatcher.stop()
+        await main.ACCOUNT.sender.close()
+        return {
+            "loop": main.LOOP_NAME, "loop_class": type(asyncio.get_running_loop()).__module__,
+            "workers": app.workers, "pool": main.MONGO_POOL_SIZE if args.mongo_url else None,
+            "messages": len(batch), "throughput": throughput,
+            "p50": pct(lat, 0.50), "p99": pct(lat, 0.99), "p999": pct(lat, 0.999), "max": lat[-1],
+        }
+
+    # loop pyrogram (dibuat saat import di bawah EVENT_LOOP), bukan loop baru dari asyncio.run
+    result = app.loop.run_until_complete(run())
+    print("RESULT " + json.dumps(result))
+
+
+def spawn(args, loop: str, workers: int, pool) -> dict:
+    env = dict(os.environ, EVENT_LOOP=loop, PYRO_WORKERS=str(workers))
+    cmd = [sys.executable, "-m", "bench.tuning_matrix", "--child", "-n", str(args.n),
+           "--chats", str(args.chats), "--rate", str(args.rate)]
+    if args.corpus:
+        cmd += ["--corpus", args.corpus]
+    if args.mongo_url:
+        env.update(STATE_BACKEND="mongo", MONGO_URL=args.mongo_url, MONGO_DB=args.mongo_db,
+                   MONGO_POOL_SIZE=str(pool))
+        cmd += ["--mongo-url", args.mongo_url]
+    out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+    line = next(ln for ln in out.splitlines() if ln.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+def parent(args):
+    loops = args.loops.split(",")
+    if "uvloop" in loops and importlib.util.find_spec("uvloop") is None:
+        print("uvloop tidak terpasang, dilewati (pip install uvloop)")
+        loops.remove("uvloop")
+    workers = [int(w) for w in args.workers.split(",")]
+    pools = [int(p) for p in args.pools.split(",")] if args.mongo_url else [None]
+
+    print(f"rate={args.rate:.0f} msg/s (latency), state backend={'mongo' if args.mongo_url else 'memory'}")
+    print(f"{'loop':<8} {'workers':>7} {'pool':>5} {'msg/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'p999 ms':>8} {'max ms':>8}")
+    rows = []
+    for loop, w, pool in itertools.product(loops, workers, pools):
+        r = spawn(args, loop, w, pool)
+        rows.append(r)
+        print(f"{r['loop']:<8} {r['workers']:>7} {r['pool'] if r['pool'] is not None else '-':>5} "
+              f"{r['throughput']:>9,.0f} {r['p50'] * 1000:>8.2f} {r['p99'] * 1000:>8.2f} "
+              f"{r['p999'] * 1000:>8.2f} {r['max'] * 1000:>8.2f}")
+    best = max(rows, key=lambda r: r["throughput"])
+    tail = min(rows, key=lambda r: r["p99"])
+    print(f"best throughput: loop={best['loop']} workers={best['workers']} pool={best['pool']}")
+    print(f"best p99       : loop={tail['loop']} workers={tail['workers']} pool={tail['pool']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=1)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sweep event loop / worker pyrogram / pool Motor atas corpus replay")
+    ap.add_argument("--corpus", help="JSONL {chat_id, text} atau teks per baris (default: sintetis)")
+    ap.add_argument("-n", type=int, default=20_000, help="jumlah pesan corpus sintetis")
+    ap.add_argument("--chats", type=int, default=200)
+    ap.add_argument("--rate", type=float, default=3000, help="pesan/detik untuk pengukuran latency")
+    ap.add_argument("--loops", default="asyncio,uvloop")
+    ap.add_argument("--workers", default="1,2,4,8,16,32")
+    ap.add_argument("--pools", default="10,50,100", help="MONGO_POOL_SIZE (hanya dengan --mongo-url)")
+    ap.add_argument("--mongo-url", default="")
+    ap.add_argument("--mongo-db", default="chatrep_bench_tuning")
+    ap.add_argument("--json", help="simpan semua hasil ke file ini")
+    ap.add_argument("--child", action="store_true")
+    a = ap.parse_args()
+    if a.child:
+        child(a)
+    else:
+        parent(a)
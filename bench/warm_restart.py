@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Time-to-first-reply setelah restart, tanpa vs dengan snapshot lokal (snapshot.py).
+# Tiap skenario jalan di proses baru (import main dari nol = restart sungguhan) lewat
+# run_accounts yang asli; yang dipalsukan cuma Telegram (Client) dan Mongo (collection
+# in-memory dengan latency connect + round trip, meniru Atlas dari jauh).
+#   1. first : boot biasa, balas satu trigger di grup 0, shutdown -> snapshot ditulis
+#   2. warm  : boot dari snapshot, Mongo di-reconcile di background
+#   3. cold  : snapshot dimatikan, boot menunggu connect + preload Mongo
+# Setelah boot, trigger yang sama di grup 0 datang lagi: kalau masih dalam cooldown,
+# warm restart tidak boleh membalasnya (cooldown ikut dipulihkan), cold restart membalas.
+
+
+def child(args):
+    import bench  # noqa: F401  env dummy
+    from bench.fakes import FakeClient, FakeCollection, make_message
+    from logpipe import ERROR
+    import main
+
+    class BootClient(FakeClient):
+        def __init__(self):
+            super().__init__()
+            self.is_connected = False
+            self.started = asyncio.Event()
+            self.first_reply = None
+
+        async def start(self):
+            self.is_connected = True
+            self.started.set()
+
+        async def stop(self):
+            self.is_connected = False
+
+        async def send_message(self, chat_id, text, reply_to_message_id=None):
+            await super().send_message(chat_id, text, reply_to_message_id)
+            if self.first_reply is None:
+                self.first_reply = time.perf_counter()
+
+    class SlowCollection(FakeCollection):
+        def __init__(self, docs=(), rtt=0.0):
+            super().__init__(docs)
+            self.rtt = rtt
+
+        def find(self, query=None, projection=None):
+            cursor = super().find(query, projection)
+            inner, rtt = cursor._iter, self.rtt
+
+            async def slow_iter():
+                await asyncio.sleep(rtt)
+                async for doc in inner():
+                    yield doc
+            cursor._iter = slow_iter
+            return cursor
+
+        async def count_documents(self, query, limit=0):
+            await asyncio.sleep(self.rtt)
+            return await super().count_documents(query, limit)
+
+        async def insert_many(self, docs, ordered=True):
+            await asyncio.sleep(self.rtt)
+            await super().insert_many(docs, ordered)
+
+        async def bulk_write(self, ops, ordered=True):
+            await asyncio.sleep(self.rtt)
+            await super().bulk_write(ops, ordered)
+
+    async def connect_mongo():
+        # SRV + TLS + auth + ping ke cluster remote
+        await asyncio.sleep(args.connect)
+        main.col = main.SETTINGS_WRITER.col = SlowCollection(
+            ({"chat_id": c, "enabled": True} for c in range(args.chats)), args.rtt)
+        main.rules_col = main.RULES.col = SlowCollection(rtt=args.rtt)
+
+    async def no_peers(_acc):
+        pass
+
+    stop = asyncio.Event()
+
+    async def idle():
+        await stop.wait()
+
+    main.LOG.level = ERROR
+    main.connect_mongo = connect_mongo
+    main.warm_peers = no_peers
+    main.idle = idle
+    main.MONGO_CHECK_INDEXES = False
+    main.HUMAN_DELAY_RANGE = (0.0, 0.0)
+    acc = main.ACCOUNT
+    client = BootClient()
+    acc.client = acc.sender.client = client
+    main.ACCOUNTS[client.name] = acc
+    trigger = args.trigger
+    result = {}
+
+    async def feed():
+        await client.started.wait()
+        if args.mode == "first":
+            await main.chatrep_handler(client, make_message(0, trigger, 1))
+            await asyncio.sleep(0.05)
+            result["replied_at"] = time.time()
+            stop.set()
+            return
+        # update yang tertunda selama restart: trigger grup 0 diulang, lalu grup lain
+        n_before = len(client.sent)
+        await main.chatrep_handler(client, make_message(0, trigger, 2))
+        await asyncio.sleep(0)
+        result["repeat_at"] = time.time()
+        result["repeat_replied"] = len(client.sent) > n_before
+        client.first_reply = None
+        msg_id = 10
+        while client.first_reply is None:
+            msg_id += 1
+            await main.chatrep_handler(client, make_message(1 + msg_id % (args.chats - 1), trigger, msg_id))
+            await asyncio.sleep(0.002)
+        result["ttfr"] = client.first_reply - main.BOOT_AT
+        stop.set()
+
+    async def run():
+        task = asyncio.create_task(feed())
+        await main.run_accounts([acc], metrics_port=0, snapshot_path=args.snapshot if args.mode != "cold" else "")
+        await task
+
+    asyncio.run(run())
+    print("RESULT " + json.dumps(result))
+
+
+def spawn(args, mode: str) -> dict:
+    cmd = [sys.executable, "-m", "bench.warm_restart", "--child", mode, "--snapshot", args.snapshot,
+           "--connect", str(args.connect), "--rtt", str(args.rtt), "--chats", str(args.chats),
+           "--trigger", args.trigger]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    line = next(ln for ln in out.splitlines() if ln.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+def parent(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        args.snapshot = os.path.join(tmp, "snapshot.db")
+        first = spawn(args, "first")
+        warm = spawn(args, "warm")
+        cold = spawn(args, "cold")
+    import bench  # noqa: F401
+    import main
+    print(f"connect={args.connect * 1000:.0f}ms rtt={args.rtt * 1000:.0f}ms active chats={args.chats}")
+    for name, r in (("cold", cold), ("warm", warm)):
+        in_cooldown = r["repeat_at"] - first["replied_at"] < main.COOLDOWN_SECONDS
+        print(f"{name}: time-to-first-reply={r['ttfr'] * 1000:.0f}ms after boot, "
+              f"pre-restart trigger replied again={r['repeat_replied']} "
+              f"({'within' if in_cooldown else 'after'} cooldown)")
+    print(f"speedup x{cold['ttfr'] / warm['ttfr']:.1f}")
+    warm_in_cooldown = warm["repeat_at"] - first["replied_at"] < main.COOLDOWN_SECONDS
+    if warm["ttfr"] >= cold["ttfr"]:
+        raise SystemExit("warm restart tidak lebih cepat dari cold restart")
+    if warm_in_cooldown and warm["repeat_replied"]:
+        raise SystemExit("cooldown dari snapshot tidak dipulihkan")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Time-to-first-reply setelah restart, tanpa / dengan snapshot")
+    ap.add_argument("--connect", type=float, default=1.5, help="detik connect Mongo (SRV + TLS + ping)")
+    ap.add_argument("--rtt", type=float, default=0.08, help="detik round trip per query Mongo")
+    ap.add_argument("--chats", type=int, default=2000, help="grup aktif")
+    ap.add_argument("--trigger", default="pagi")
+    ap.add_argument("--snapshot", default="")
+    ap.add_argument("--child", choices=("first", "warm", "cold"))
+    a = ap.parse_args()
+    if a.child:
+        a.mode = a.child
+        child(a)
+    else:
+        parent(a)
@@ -3,14 +3,46 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# wajib untuk akun default (main.py); mode supervisor boleh mengisinya per session
 API_ID = int(os.getenv("API_ID", "0"))
 API_HASH = os.getenv("API_HASH", "").strip()
 
 MONGO_URL = os.getenv("MONGO_URL", "").strip()
 MONGO_DB = os.getenv("MONGO_DB", "chatrep").strip()
 
-if not API_ID or not API_HASH:
-    raise SystemExit("API_ID / API_HASH belum diset di .env")
+# Motor client: pool koneksi, timeout (ms, 0 = default driver / tanpa batas), kompresi wire
+# (mis. "zstd,zlib"; zstd/snappy butuh paket zstandard / python-snappy), kosong = mati
+MONGO_POOL_SIZE = int(os.getenv("MONGO_POOL_SIZE", "50"))
+MONGO_MIN_POOL = int(os.getenv("MONGO_MIN_POOL", "0"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "10000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "").strip()
+# buat index + explain query hot path saat startup, gagal kalau ada yang COLLSCAN
+MONGO_CHECK_INDEXES = os.getenv("MONGO_CHECK_INDEXES", "1").strip().lower() in ("1", "true", "yes")
+
+# snapshot lokal (SQLite) grup aktif + cooldown buat warm restart (snapshot.py), kosong = mati;
+# worker supervisor memakai file sendiri (<nama>.<index>.db)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "chatrep_snapshot.db").strip()
+
+# event loop: auto (uvloop kalau terpasang) | uvloop | asyncio
+EVENT_LOOP = os.getenv("EVENT_LOOP", "auto").strip().lower()
+# jumlah worker handler pyrogram per Client (juga ukuran thread pool filter), 0 = default pyrogram
+PYRO_WORKERS = int(os.getenv("PYRO_WORKERS", "0"))
+
+# endpoint metrics (Prometheus) di 127.0.0.1:METRICS_PORT, 0 = mati
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# state cooldown / grup aktif: memory (per proses) | mongo (dibagi antar instance)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").strip().lower()
+
+# cetak waktu startup per fase (import, config, compile rules, Mongo, session, update pertama)
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0").strip().lower() in ("1", "true", "yes")
 
 if not MONGO_URL:
     raise SystemExit("MONGO_URL belum diset di .env")
+
+if EVENT_LOOP not in ("auto", "uvloop", "asyncio"):
+    raise SystemExit("EVENT_LOOP harus auto, uvloop atau asyncio")
+
+if STATE_BACKEND not in ("memory", "mongo"):
+    raise SystemExit("STATE_BACKEND harus memory atau mongo")
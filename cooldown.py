@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+
+# Cooldown store dengan TTL + batas jumlah key.
+# TTL-nya seragam, jadi urutan insert = urutan expire: OrderedDict cukup jadi
+# antrian expire (FIFO). claim() O(1) amortized, key lama dibuang dari depan.
+
+
+class CooldownStore:
+    def __init__(self, ttl: float, max_keys: int = 100_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = float(ttl)
+        self.max_keys = int(max_keys)
+        self.clock = clock
+        self._last: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.expired = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def __contains__(self, key: Hashable) -> bool:
+        last = self._last.get(key)
+        return last is not None and self.clock() - last < self.ttl
+
+    def _purge(self, now: float):
+        last = self._last
+        deadline = now - self.ttl
+        while last:
+            key, ts = next(iter(last.items()))
+            if ts > deadline:
+                break
+            del last[key]
+            self.expired += 1
+
+    # True kalau key boleh kirim (dan langsung dicatat), False kalau masih cooldown
+    def claim(self, key: Hashable) -> bool:
+        now = self.clock()
+        last = self._last.get(key)
+        if last is not None and now - last < self.ttl:
+            return False
+        self._last[key] = now
+        self._last.move_to_end(key)
+        self._purge(now)
+        while len(self._last) > self.max_keys:
+            self._last.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    # (key, umur dalam detik) yang masih aktif, tertua dulu; buat snapshot (snapshot.py)
+    def dump(self) -> List[Tuple[Hashable, float]]:
+        now = self.clock()
+        self._purge(now)
+        return [(key, now - ts) for key, ts in self._last.items()]
+
+    # isi ulang dari snapshot saat boot (sebelum claim pertama), entries tertua dulu
+    def restore(self, entries: Iterable[Tuple[Hashable, float]]):
+        now = self.clock()
+        for key, age in entries:
+            if age < self.ttl and key not in self._last:
+                self._last[key] = now - max(age, 0.0)
+
+    def stats(self) -> Dict[str, int]:
+        self._purge(self.clock())
+        return {"live": len(self._last), "expired": self.expired, "evictions": self.evictions}
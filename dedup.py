@@ -0,0 +1,57 @@
+from array import array
+from typing import Dict, Set
+
+from metrics import Counter
+
+# Pesan grup yang baru diproses, supaya update yang terkirim dua kali (reconnect,
+# retry di patch handle_updates) tidak di-match / dibalas lagi.
+# Ring buffer berkapasitas tetap (dua array int64: chat_id, message_id) + index set
+# message_id per chat. Entri tertua otomatis keluar begitu ring-nya penuh.
+
+DUPLICATES = Counter("chatrep_duplicate_updates_total", "Update pesan yang sudah pernah diproses (dibuang)")
+
+
+class RecentMessages:
+    def __init__(self, capacity: int = 50_000):
+        self.capacity = int(capacity)
+        self._chats = array("q", bytes(8 * self.capacity))
+        self._msgs = array("q", bytes(8 * self.capacity))
+        self._pos = 0
+        self._full = False
+        self.index: Dict[int, Set[int]] = {}
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return self.capacity if self._full else self._pos
+
+    def __contains__(self, key) -> bool:
+        chat_id, msg_id = key
+        ids = self.index.get(chat_id)
+        return ids is not None and msg_id in ids
+
+    # True kalau (chat_id, msg_id) sudah pernah dilihat; kalau belum, langsung dicatat
+    def seen(self, chat_id: int, msg_id: int) -> bool:
+        ids = self.index.get(chat_id)
+        if ids is not None and msg_id in ids:
+            self.duplicates += 1
+            DUPLICATES.inc()
+            return True
+        pos = self._pos
+        if self._full:
+            old_chat = self._chats[pos]
+            old = self.index.get(old_chat)
+            if old is not None:
+                old.discard(self._msgs[pos])
+                if not old:
+                    del self.index[old_chat]
+        self._chats[pos] = chat_id
+        self._msgs[pos] = msg_id
+        if ids is None:
+            ids = self.index[chat_id] = set()
+        ids.add(msg_id)
+        pos += 1
+        if pos == self.capacity:
+            pos = 0
+            self._full = True
+        self._pos = pos
+        return False
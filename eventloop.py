@@ -0,0 +1,18 @@
+import asyncio
+
+# Pilihan event loop (EVENT_LOOP di .env): auto = uvloop kalau terpasang, uvloop = wajib
+# (gagal kalau paketnya tidak ada), asyncio = loop bawaan.
+# Harus dipanggil sebelum import pyrogram: pyrogram.sync membuat loop utamanya saat di-import.
+
+
+def install_event_loop(choice: str = "auto") -> str:
+    if choice == "asyncio":
+        return "asyncio"
+    try:
+        import uvloop
+    except ImportError:
+        if choice == "uvloop":
+            raise SystemExit("EVENT_LOOP=uvloop tapi paket uvloop belum terpasang (pip install uvloop)")
+        return "asyncio"
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return "uvloop"
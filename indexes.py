@@ -0,0 +1,90 @@
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from logpipe import INFO, WARN, print_log
+
+ASCENDING = 1  # = pymongo.ASCENDING
+
+# Index Mongo yang dibuat saat startup + cek explain untuk query hot path.
+#   chatrep_settings: unique (account, chat_id)          -> upsert write-behind .on/.off/.rule
+#                     partial (account, enabled) enabled -> preload grup aktif
+#   chatrep_peers   : unique (account, peer_id)          -> load / save access hash
+# Index chatrep_cooldowns (TTL) diurus MongoBackend.setup().
+#
+# check_hot_queries() menjalankan explain (queryPlanner) untuk tiap query hot path dan
+# melempar IndexCheckError kalau winning plan-nya COLLSCAN: lebih baik gagal saat boot
+# daripada diam-diam scan seluruh collection tiap restart / tiap flush.
+
+INDEXES: Dict[str, List[Tuple[List[Tuple[str, int]], Dict[str, Any]]]] = {
+    "chatrep_settings": [
+        ([("account", ASCENDING), ("chat_id", ASCENDING)], {"name": "account_chat", "unique": True}),
+        # key pattern beda dari account_chat (Mongo menolak dua index dengan key yang sama)
+        ([("account", ASCENDING), ("enabled", ASCENDING)],
+         {"name": "enabled_chats", "partialFilterExpression": {"enabled": True}}),
+    ],
+    "chatrep_peers": [
+        ([("account", ASCENDING), ("peer_id", ASCENDING)], {"name": "account_peer", "unique": True}),
+    ],
+}
+
+
+INDEX_STAGES = ("IXSCAN", "EXPRESS_IXSCAN", "IDHACK")
+
+
+class IndexCheckError(RuntimeError):
+    pass
+
+
+def hot_queries(account_keys: Iterable) -> List[Tuple[str, dict]]:
+    queries = []
+    for key in account_keys:
+        queries += [
+            ("chatrep_settings", {"account": key, "enabled": True}),
+            ("chatrep_settings", {"account": key, "chat_id": 0}),
+            ("chatrep_peers", {"account": key}),
+        ]
+    return queries
+
+
+async def ensure_indexes(db, log: Callable[..., None] = print_log):
+    from pymongo.errors import OperationFailure
+    for name, specs in INDEXES.items():
+        for keys, options in specs:
+            try:
+                await db[name].create_index(keys, **options)
+            except OperationFailure as e:
+                # mis. chat_id dobel di data lama (unique gagal): query tetap jalan, cek explain yang menentukan
+                log(WARN, "MONGO", "create index failed", index=f"{name}.{options['name']}", err=str(e))
+
+
+def plan_stages(plan: dict) -> List[str]:
+    stages = []
+    todo = [plan]
+    while todo:
+        node = todo.pop()
+        if "stage" in node:
+            stages.append(node["stage"])
+        if "inputStage" in node:
+            todo.append(node["inputStage"])
+        todo.extend(node.get("inputStages", ()))
+        # SBE / explain versi baru: plan ada di queryPlan
+        if "queryPlan" in node:
+            todo.append(node["queryPlan"])
+    return stages
+
+
+async def explain_stages(db, collection: str, query: dict) -> List[str]:
+    result = await db.command("explain", {"find": collection, "filter": query}, verbosity="queryPlanner")
+    return plan_stages(result["queryPlanner"]["winningPlan"])
+
+
+async def check_hot_queries(db, queries: Iterable[Tuple[str, dict]], log: Callable[..., None] = print_log):
+    bad = []
+    checked = 0
+    for collection, query in queries:
+        stages = await explain_stages(db, collection, query)
+        checked += 1
+        if "COLLSCAN" in stages or not any(s in INDEX_STAGES for s in stages):
+            bad.append(f"{collection} {query}: {' <- '.join(stages)}")
+    if bad:
+        raise IndexCheckError("query hot path tidak memakai index:\n  " + "\n  ".join(bad))
+    log(INFO, "MONGO", "index check ok", queries=checked)
@@ -0,0 +1,115 @@
+import json
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, TextIO
+
+# Logger non-blocking: event loop cuma cek level/sampling lalu append ke deque
+# (append/popleft deque thread-safe, tanpa lock). Format (teks / JSON) dan write ke
+# stream dikerjakan thread terpisah yang menguras deque secara berkala.
+# Kalau level mati atau event tidak kena sampling, tidak ada formatting sama sekali.
+# Modul lain menerima LogPipe.log sebagai callback log(level, category, msg, **fields).
+
+DEBUG, INFO, WARN, ERROR = 10, 20, 30, 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARN": WARN, "WARNING": WARN, "ERROR": ERROR}
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARN: "WARN", ERROR: "ERROR"}
+
+
+def format_text(category: str, msg: str, fields: dict) -> str:
+    parts = [f"[{category}]"] if category else []
+    if msg:
+        parts.append(msg)
+    parts.extend(f"{k}={v!r}" if isinstance(v, str) else f"{k}={v}" for k, v in fields.items())
+    return " ".join(parts)
+
+
+# default callback log modul lain (sender, settings_writer, rules_store, ...) kalau tidak
+# diberi LogPipe.log: signature sama, langsung print
+def print_log(level: int, category: str, msg: str = "", **fields):
+    print(format_text(category, msg, fields))
+
+
+class LogPipe:
+    def __init__(self, level: int = INFO, sample: Optional[Dict[str, float]] = None,
+                 json_output: bool = False, stream: Optional[TextIO] = None,
+                 max_queue: int = 10_000, flush_interval: float = 0.05):
+        self.level = level
+        self.sample = dict(sample or {})
+        self.json_output = json_output
+        self.stream = stream
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.queue: Deque[tuple] = deque()
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def log(self, level: int, category: str, msg: str = "", **fields):
+        if level < self.level:
+            return
+        rate = self.sample.get(category)
+        if rate is not None and random.random() >= rate:
+            return
+        if self._thread is None:
+            self.start()
+        if len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self.queue.append((time.time(), level, category, msg, fields))
+
+    def debug(self, category: str, msg: str = "", **fields):
+        self.log(DEBUG, category, msg, **fields)
+
+    def info(self, category: str, msg: str = "", **fields):
+        self.log(INFO, category, msg, **fields)
+
+    def warn(self, category: str, msg: str = "", **fields):
+        self.log(WARN, category, msg, **fields)
+
+    def error(self, category: str, msg: str = "", **fields):
+        self.log(ERROR, category, msg, **fields)
+
+    def format(self, ts: float, level: int, category: str, msg: str, fields: dict) -> str:
+        if self.json_output:
+            record = {"ts": round(ts, 3), "level": LEVEL_NAMES.get(level, level), "cat": category}
+            if msg:
+                record["msg"] = msg
+            record.update(fields)
+            return json.dumps(record, ensure_ascii=False, default=str)
+        return format_text(category, msg, fields)
+
+    def _drain(self):
+        q = self.queue
+        if not q:
+            return
+        stream = self.stream or sys.stdout
+        lines = []
+        while q:
+            try:
+                lines.append(self.format(*q.popleft()))
+            except Exception:  # satu record rusak jangan bikin thread logger mati
+                pass
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except Exception:
+            pass
+
+    def _write(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._write, name="logpipe", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
@@ -1,28 +1,63 @@
 import asyncio
+import os
 import random
+import sqlite3
 import time
-from typing import Dict, Tuple, Set, Union, List
-
-from pyrogram import Client, filters
-from pyrogram.enums import ChatType
-from pyrogram.errors import FloodWait, RPCError
-from motor.motor_asyncio import AsyncIOMotorClient
-
-from config import API_ID, API_HASH, MONGO_URL, MONGO_DB
+from typing import Dict, Set, List
+
+from startup import PROFILE
+from config import API_ID, API_HASH, MONGO_URL, MONGO_DB, METRICS_PORT, STATE_BACKEND, STARTUP_PROFILE
+from config import (MONGO_POOL_SIZE, MONGO_MIN_POOL, MONGO_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+                    MONGO_COMPRESSORS, MONGO_CHECK_INDEXES, SNAPSHOT_PATH, EVENT_LOOP, PYRO_WORKERS)
+PROFILE.mark("config parse")
+
+# sebelum import pyrogram (loop utamanya dibuat saat import)
+from eventloop import install_event_loop  # noqa: E402
+LOOP_NAME = install_event_loop(EVENT_LOOP)
+
+from pyrogram import Client, filters, idle  # noqa: E402
+from pyrogram.enums import ChatType  # noqa: E402
+from pyrogram.handlers import MessageHandler  # noqa: E402
+# motor di-import lazy di open_mongo()
+
+from admission import Admission
+from cooldown import CooldownStore
+from dedup import RecentMessages
+from indexes import check_hot_queries, ensure_indexes, hot_queries
+from logpipe import LEVELS, LogPipe
+import metrics
+from matcher import MessageView, Rule, RuleMatcher, normalize, rule_id, rule_key
+from menu import MenuIndex, chunk_text
+from overlays import Overlay, OverlayCache, overlay_doc, parse_overlay
+from peers import UPDATES_RETRIED, UPDATES_SKIPPED, PeerCache, widen_channel_range
+from rotation import RotationStore
+from rules_store import RuleStore
+from sender import SendScheduler
+from state_backend import MemoryBackend, MongoBackend
+from settings_writer import SettingsWriter
+from snapshot import AccountSnapshot, load_snapshot, save_snapshot
+PROFILE.mark("imports")
 
 # =========================
 # SETTINGS
 # =========================
 DEBUG = True
-
-# Trigger rules: (trigger, response, mode) mode: contains | exact
-# response bisa str atau list[str]
+# log: level, sampling per kategori (0.01 = 1% event dicatat), output JSON
+LOG_LEVEL = "DEBUG" if DEBUG else "INFO"
+LOG_SAMPLE = {"IN": 0.01}
+LOG_JSON = False
+
+# Trigger rules: (trigger, response, mode) mode: contains | exact | word | regex
+#   word : trigger harus muncul utuh sebagai kata ("bot" tidak kena "robot"/"bottle")
+#   regex: pattern Python, case-insensitive
+# response bisa str atau list[str]; item list boleh ("teks", bobot) untuk balasan berbobot
+# Ini default / seed; rules aktif dibaca dari Mongo (collection chatrep_rules)
 CHATREP_RULES = [
     # ===== BOT / UBOT =====
     ("ubot", ["bot gacor di sini @asepvoid", "ubot gacor ada", "gas ke @asepvoid", "ubot aman kak"], "contains"),
     ("userbot", ["userbot gacor ada", "userbot aman", "userbot jalan kak", "userbot aktif"], "contains"),
-    ("bot", ["bukan bot", "apalah", "halu kak", "kok bot sih"], "contains"),
-    ("ai", ["halu dikit", "ai apaan", "ga ngerti ai", "kok ai"], "contains"),
+    ("bot", ["bukan bot", "apalah", "halu kak", "kok bot sih"], "word"),
+    ("ai", ["halu dikit", "ai apaan", "ga ngerti ai", "kok ai"], "word"),
     ("robot", ["aku manusia", "bukan robot", "human kak", "ngaco lu"], "contains"),
     ("auto", ["auto kak", "auto jalan", "auto gas", "auto aja"], "contains"),
     ("script", ["spill script", "mana script", "kirim dulu"], "contains"),
@@ -33,38 +68,38 @@ CHATREP_RULES = [
     ("halo", ["yo", "halo juga", "apa kak", "iya"], "contains"),
     ("hallo", ["yo", "halo", "hai juga", "apa"], "contains"),
     ("p", ["yo", "apa", "kenapa"], "exact"),
-    ("oi", ["apa", "kenapa", "hah"], "contains"),
-    ("oy", ["kenapa", "apa kak", "hah"], "contains"),
-    ("woi", ["apa kak", "kenapa", "hah"], "contains"),
-    ("weh", ["apa", "kenapa", "hah"], "contains"),
-    ("eh", ["kenapa", "apa", "hah"], "contains"),
-    ("bro", ["iya bro", "siap bro", "gas bro", "apa bro"], "contains"),
-    ("kak", ["iya kak", "kenapa kak", "apa kak", "hm"], "contains"),
-    ("bang", ["siap bang", "kenapa bang", "apa bang", "hm"], "contains"),
-    ("gan", ["siap gan", "kenapa gan", "apa gan"], "contains"),
-    ("min", ["iya min", "kenapa min", "apa min"], "contains"),
-    ("bos", ["siap bos", "kenapa bos", "apa bos"], "contains"),
-    ("cuy", ["apa cuy", "kenapa cuy", "gas cuy"], "contains"),
-    ("cuk", ["apa cuk", "waduh", "wkwk"], "contains"),
-    ("sis", ["iya sis", "kenapa sis", "apa sis"], "contains"),
+    ("oi", ["apa", "kenapa", "hah"], "word"),
+    ("oy", ["kenapa", "apa kak", "hah"], "word"),
+    ("woi", ["apa kak", "kenapa", "hah"], "word"),
+    ("weh", ["apa", "kenapa", "hah"], "word"),
+    ("eh", ["kenapa", "apa", "hah"], "word"),
+    ("bro", ["iya bro", "siap bro", "gas bro", "apa bro"], "word"),
+    ("kak", ["iya kak", "kenapa kak", "apa kak", "hm"], "word"),
+    ("bang", ["siap bang", "kenapa bang", "apa bang", "hm"], "word"),
+    ("gan", ["siap gan", "kenapa gan", "apa gan"], "word"),
+    ("min", ["iya min", "kenapa min", "apa min"], "word"),
+    ("bos", ["siap bos", "kenapa bos", "apa bos"], "word"),
+    ("cuy", ["apa cuy", "kenapa cuy", "gas cuy"], "word"),
+    ("cuk", ["apa cuk", "waduh", "wkwk"], "word"),
+    ("sis", ["iya sis", "kenapa sis", "apa sis"], "word"),
     ("bestie", ["iya bestie", "kenapa", "gas"], "contains"),
-    ("beb", ["iya beb", "kenapa", "apa"], "contains"),
+    ("beb", ["iya beb", "kenapa", "apa"], "word"),
     ("ayang", ["iya ayang", "kenapa", "apa"], "contains"),
 
     # ===== KEHADIRAN =====
     ("hadir", ["hadir kak", "siap hadir", "gas", "hadir min"], "contains"),
     ("online", ["hadir", "online kak", "siap", "hadir kak"], "contains"),
-    ("off", ["gas dulu", "off dulu", "cabut dulu", "oke"], "contains"),
+    ("off", ["gas dulu", "off dulu", "cabut dulu", "oke"], "word"),
     ("offline", ["oke", "gas dulu", "cabut", "hati-hati"], "contains"),
-    ("afk", ["oke kak", "siap", "ditunggu", "gas"], "contains"),
-    ("brb", ["ditunggu", "oke kak", "siap", "balik lagi"], "contains"),
+    ("afk", ["oke kak", "siap", "ditunggu", "gas"], "word"),
+    ("brb", ["ditunggu", "oke kak", "siap", "balik lagi"], "word"),
     ("balik", ["gas", "akhirnya", "oke", "hadir lagi"], "contains"),
     ("gone", ["oke", "gas", "hati-hati"], "contains"),
 
     # ===== LOKASI / GERAK =====
     ("live", ["dimana kak", "lagi dimana", "lokasi mana", "shareloc dong"], "contains"),
-    ("tmo", ["dimana kak", "lokasi mana", "shareloc kak", "tmo mana"], "contains"),
-    ("otw", ["otw kak", "gas", "hati-hati", "siap jalan"], "contains"),
+    ("tmo", ["dimana kak", "lokasi mana", "shareloc kak", "tmo mana"], "word"),
+    ("otw", ["otw kak", "gas", "hati-hati", "siap jalan"], "word"),
     ("otwe", ["otw kak", "gas", "hati-hati"], "contains"),
     ("dbyohh", ["otwe kak", "gas otw", "siap jalan"], "contains"),
     ("nyampe", ["aman kak", "sip", "akhirnya", "gas"], "contains"),
@@ -79,59 +114,59 @@ CHATREP_RULES = [
 
     # ===== AJAKAN =====
     ("call", ["ayukk kak", "gas call", "kapan call", "join call"], "contains"),
-    ("vc", ["yukk kak", "gas vc", "masuk vc", "join vc"], "contains"),
+    ("vc", ["yukk kak", "gas vc", "masuk vc", "join vc"], "word"),
     ("koll", ["ayukk koll kak", "gas koll", "join koll", "koll gas"], "contains"),
     ("join", ["ikut kak", "gas masuk", "mana link", "ayo"], "contains"),
     ("masuk", ["gas kak", "ikut", "oke", "ayok"], "contains"),
     ("nongkrong", ["gas kak", "ayuk", "dimana", "kuy"], "contains"),
     ("mabar", ["gas mabar", "ayuk mabar", "main apa", "kuy"], "contains"),
     ("push", ["gas push", "ayuk push", "rank berapa", "kuy"], "contains"),
-    ("duo", ["gas duo", "kuy", "ayok"], "contains"),
+    ("duo", ["gas duo", "kuy", "ayok"], "word"),
     ("party", ["gas party", "kuy", "ikut"], "contains"),
 
     # ===== PERTANYAAN UMUM =====
-    ("apa", ["iya kenapa", "kenapa kak", "apa kak", "hah", "apaan"], "contains"),
+    ("apa", ["iya kenapa", "kenapa kak", "apa kak", "hah", "apaan"], "word"),
     ("apaan", ["apaan", "hah", "kenapa", "apasi"], "contains"),
     ("apasih", ["apaan", "hah", "kenapa", "apasi"], "contains"),
     ("kenapa", ["gatau kak", "kenapa emang", "kurang tau", "kenapa tuh", "hah"], "contains"),
-    ("knp", ["gatau kak", "kenapa emang", "kenapa tuh"], "contains"),
-    ("kok", ["gatau kak", "kok bisa", "iya ya", "aneh ya", "lah iya"], "contains"),
+    ("knp", ["gatau kak", "kenapa emang", "kenapa tuh"], "word"),
+    ("kok", ["gatau kak", "kok bisa", "iya ya", "aneh ya", "lah iya"], "word"),
     ("siapa", ["gatau kak", "kurang tau", "siapa tuh", "siapa emang"], "contains"),
     ("dimana", ["kurang tau", "dimana emang", "lokasi mana", "shareloc"], "contains"),
-    ("dmn", ["lokasi mana", "dimana emang", "shareloc"], "contains"),
+    ("dmn", ["lokasi mana", "dimana emang", "shareloc"], "word"),
     ("kapan", ["nanti kak", "belum tau", "kayaknya nanti", "ntar"], "contains"),
-    ("kpn", ["nanti", "belum tau", "ntar"], "contains"),
+    ("kpn", ["nanti", "belum tau", "ntar"], "word"),
     ("gimana", ["jalanin aja", "pelan-pelan", "aman kak", "gitu aja", "yaudah"], "contains"),
-    ("gmn", ["pelan-pelan", "jalanin aja", "aman"], "contains"),
+    ("gmn", ["pelan-pelan", "jalanin aja", "aman"], "word"),
     ("berapa", ["kurang tau", "ga ngitung", "sekitar segitu", "brp emang"], "contains"),
-    ("brp", ["kurang tau", "sekitar segitu", "ga ngitung"], "contains"),
+    ("brp", ["kurang tau", "sekitar segitu", "ga ngitung"], "word"),
 
     # ===== REAKSI / EKSPRESI =====
-    ("anu", ["anu apanya kak", "anu yang mana", "hah anu"], "contains"),
+    ("anu", ["anu apanya kak", "anu yang mana", "hah anu"], "word"),
     ("becek", ["waduh becek", "becek bener", "hati-hati licin"], "contains"),
     ("wkwk", ["wkwk", "ngakak", "ketawa mulu", "wkwkwk"], "contains"),
     ("wk", ["wkwk", "ngakak", "wkwk"], "contains"),
     ("haha", ["wkwk", "ngakak", "haha juga"], "contains"),
     ("hehe", ["hehe", "wkwk", "asik"], "contains"),
-    ("lol", ["ngakak", "wkwk"], "contains"),
+    ("lol", ["ngakak", "wkwk"], "word"),
     ("anjir", ["santai kak", "waduh", "parah", "anjir juga"], "contains"),
     ("njir", ["waduh", "anjir", "wkwk"], "contains"),
-    ("jir", ["wkwk", "anjir", "waduh"], "contains"),
+    ("jir", ["wkwk", "anjir", "waduh"], "word"),
     ("buset", ["waduh", "parah", "anjir"], "contains"),
     ("gila", ["anjir", "parah", "gokil"], "contains"),
     ("parah", ["waduh", "parah juga", "gila"], "contains"),
     ("waduh", ["waduh", "lah iya", "santai"], "contains"),
-    ("yah", ["yah", "waduh", "lain kali"], "contains"),
-    ("lah", ["iya juga", "lah iya", "wkwk"], "contains"),
-    ("loh", ["iya ya", "loh iya", "wkwk"], "contains"),
+    ("yah", ["yah", "waduh", "lain kali"], "word"),
+    ("lah", ["iya juga", "lah iya", "wkwk"], "word"),
+    ("loh", ["iya ya", "loh iya", "wkwk"], "word"),
     ("anjay", ["mantap", "wkwk", "gas"], "contains"),
 
     # ===== MEDIA =====
-    ("pap", ["kirim kak ke cpc", "spill kak", "gas pap", "mana pap"], "contains"),
+    ("pap", ["kirim kak ke cpc", "spill kak", "gas pap", "mana pap"], "word"),
     ("foto", ["spill kak", "kirim kak", "gas", "mana foto"], "contains"),
     ("video", ["spill kak", "kirim kak", "gas", "mana video"], "contains"),
     ("vidio", ["spill kak", "kirim kak", "gas"], "contains"),
-    ("ss", ["spill kak", "mana ss", "kirim dulu", "mana ss nya"], "contains"),
+    ("ss", ["spill kak", "mana ss", "kirim dulu", "mana ss nya"], "word"),
     ("rekam", ["gas kak", "spill", "kirim"], "contains"),
     ("bukti", ["mana bukti", "spill", "kirim"], "contains"),
     ("link", ["mana link", "kirim link", "spill link"], "contains"),
@@ -192,7 +227,7 @@ CHATREP_RULES = [
     ("aneh", ["iya juga", "aneh ya", "wkwk"], "contains"),
 
     # ===== INTERNET SLANG =====
-    ("fix", ["iya fix", "fix bener", "fix sih"], "contains"),
+    ("fix", ["iya fix", "fix bener", "fix sih"], "word"),
     ("real", ["real sih", "iya real", "bener"], "contains"),
     ("relate", ["relate banget", "iya relate", "bener sih"], "contains"),
     ("valid", ["valid sih", "iya valid", "bener"], "contains"),
@@ -205,8 +240,8 @@ CHATREP_RULES = [
     ("makasih", ["siap kak", "sama-sama", "aman"], "contains"),
     ("terimakasih", ["sama-sama", "siap kak", "aman"], "contains"),
     ("thanks", ["siap", "aman", "sama-sama"], "contains"),
-    ("thx", ["siap", "aman"], "contains"),
-    ("bye", ["gas dulu", "hati-hati", "aman"], "contains"),
+    ("thx", ["siap", "aman"], "word"),
+    ("bye", ["gas dulu", "hati-hati", "aman"], "word"),
     ("dadah", ["hati-hati", "aman kak", "gas"], "contains"),
     ("cabut", ["gas kak", "aman", "bye"], "contains"),
 
@@ -231,34 +266,34 @@ CHATREP_RULES = [
     ("kok bisa sih", ["iya ya", "aneh ya", "gatau"], "contains"),
 
     # ===== VARIAN "IYA / YA / OKE" biar gak 1 respon =====
-    ("iya", ["oke", "iya", "siap", "iya kak", "oke kak", "iya bro", "iyain aja"], "contains"),
+    ("iya", ["oke", "iya", "siap", "iya kak", "oke kak", "iya bro", "iyain aja"], "word"),
     ("iyaaa", ["oke kak", "siap", "iya", "iya dong"], "contains"),
     ("iyah", ["iya", "oke", "siap", "iyahh"], "contains"),
-    ("ya", ["iya", "oke", "siap", "yaudah"], "contains"),
+    ("ya", ["iya", "oke", "siap", "yaudah"], "word"),
     ("yaa", ["iya", "oke", "siap", "yaudah"], "contains"),
     ("y", ["iya", "oke", "siap"], "exact"),
-    ("yoi", ["yoi", "gas", "siap", "mantap"], "contains"),
+    ("yoi", ["yoi", "gas", "siap", "mantap"], "word"),
     ("yoii", ["gas", "yoi", "siap"], "contains"),
-    ("sip", ["sip", "aman", "gas", "oke"], "contains"),
+    ("sip", ["sip", "aman", "gas", "oke"], "word"),
     ("sipp", ["sip", "gas", "aman"], "contains"),
-    ("oke", ["oke", "siap", "aman", "gas"], "contains"),
+    ("oke", ["oke", "siap", "aman", "gas"], "word"),
     ("okeh", ["okeh", "siap", "aman"], "contains"),
-    ("ok", ["ok", "siap", "aman"], "contains"),
+    ("ok", ["ok", "siap", "aman"], "word"),
     ("okey", ["ok", "siap", "aman"], "contains"),
     ("deal", ["deal", "gas", "siap"], "contains"),
     ("setuju", ["gas", "iya", "setuju", "oke"], "contains"),
     ("boleh", ["boleh", "gas", "oke"], "contains"),
     ("boleh sih", ["boleh", "gas", "oke"], "contains"),
-    ("gas", ["gas", "ayo", "siap", "kuy"], "contains"),
+    ("gas", ["gas", "ayo", "siap", "kuy"], "word"),
     ("gass", ["gas", "ayo", "siap"], "contains"),
     ("gaskeun", ["gas", "ayo", "kuy"], "contains"),
     ("lanjut", ["gas lanjut", "oke", "siap", "next"], "contains"),
 
     # ===== PENOLAKAN / NEGASI (varian typo) =====
-    ("ga", ["waduh", "yah", "oke", "yaudah"], "contains"),
+    ("ga", ["waduh", "yah", "oke", "yaudah"], "word"),
     ("g", ["waduh", "yah", "oke"], "exact"),
-    ("gak", ["waduh", "yah", "oke", "yaudah"], "contains"),
-    ("gk", ["waduh", "yah", "oke"], "contains"),
+    ("gak", ["waduh", "yah", "oke", "yaudah"], "word"),
+    ("gk", ["waduh", "yah", "oke"], "word"),
     ("nggak", ["waduh", "yah", "oke"], "contains"),
     ("ngga", ["waduh", "yah", "oke"], "contains"),
     ("engga", ["waduh", "yah", "oke"], "contains"),
@@ -271,16 +306,16 @@ CHATREP_RULES = [
     ("ga jadi", ["oke", "yaudah", "lain kali"], "contains"),
 
     # ===== “GIMANA” / “DIMANA” / “KAPAN” versi singkatan =====
-    ("dmn", ["lokasi mana", "dimana emang", "shareloc"], "contains"),
+    ("dmn", ["lokasi mana", "dimana emang", "shareloc"], "word"),
     ("dmna", ["lokasi mana", "dimana emang", "shareloc"], "contains"),
     ("dmmn", ["lokasi mana", "dimana emang", "shareloc"], "contains"),
-    ("gmn", ["pelan-pelan", "jalanin aja", "aman"], "contains"),
+    ("gmn", ["pelan-pelan", "jalanin aja", "aman"], "word"),
     ("gmana", ["jalanin aja", "pelan-pelan", "aman"], "contains"),
     ("gmna", ["jalanin aja", "pelan-pelan", "aman"], "contains"),
-    ("kpn", ["nanti", "belum tau", "ntar"], "contains"),
+    ("kpn", ["nanti", "belum tau", "ntar"], "word"),
     ("kapan nih", ["nanti", "ntar", "belum tau"], "contains"),
     ("kpn nih", ["nanti", "ntar", "belum tau"], "contains"),
-    ("brp", ["kurang tau", "sekitar segitu", "ga ngitung"], "contains"),
+    ("brp", ["kurang tau", "sekitar segitu", "ga ngitung"], "word"),
     ("brapa", ["kurang tau", "sekitar segitu"], "contains"),
 
     # ===== RESPONS “IYA KENAPA” / “KENAPA KAK” (varian banyak) =====
@@ -314,21 +349,21 @@ CHATREP_RULES = [
     ("anjay", ["gas", "mantap", "wkwk"], "contains"),
     ("mantul", ["mantap", "gas", "sip"], "contains"),
     ("goks", ["gokil", "mantap", "gas"], "contains"),
-    ("gg", ["mantap", "gas", "gg"], "contains"),
+    ("gg", ["mantap", "gas", "gg"], "word"),
     ("ggez", ["wkwk", "gg", "gas"], "contains"),
-    ("nt", ["nt", "wkwk", "mantap"], "contains"),
+    ("nt", ["nt", "wkwk", "mantap"], "word"),
     ("nice", ["mantap", "oke", "sip"], "contains"),
     ("cringe", ["waduh", "wkwk", "aneh"], "contains"),
     ("respect", ["mantap", "sip", "gas"], "contains"),
     ("savage", ["anjir", "parah", "wkwk"], "contains"),
-    ("cie", ["ciee", "wkwk", "asek"], "contains"),
+    ("cie", ["ciee", "wkwk", "asek"], "word"),
     ("ciee", ["ciee", "wkwk", "asek"], "contains"),
     ("asek", ["asek", "wkwk", "mantap"], "contains"),
 
     # ===== MABAR / GAME (biar rame) =====
-    ("ml", ["gas mabar", "rank apa", "ayok"], "contains"),
+    ("ml", ["gas mabar", "rank apa", "ayok"], "word"),
     ("mobile legend", ["gas mabar", "rank apa", "ayok"], "contains"),
-    ("ff", ["gas mabar", "room mana", "ayok"], "contains"),
+    ("ff", ["gas mabar", "room mana", "ayok"], "word"),
     ("free fire", ["gas mabar", "room mana", "ayok"], "contains"),
     ("valo", ["gas valo", "party mana", "ayok"], "contains"),
     ("valorant", ["gas valo", "party mana", "ayok"], "contains"),
@@ -344,11 +379,11 @@ CHATREP_RULES = [
     ("stock", ["stok ada", "ready", "gas"], "contains"),
     ("harga", ["dm aja", "cek pm", "tanya pm"], "contains"),
     ("price", ["dm aja", "cek pm", "tanya pm"], "contains"),
-    ("dm", ["cek pm", "siap", "gas"], "contains"),
-    ("pm", ["cek pm", "siap", "gas"], "contains"),
-    ("cod", ["bisa cod", "aman", "gas"], "contains"),
+    ("dm", ["cek pm", "siap", "gas"], "word"),
+    ("pm", ["cek pm", "siap", "gas"], "word"),
+    ("cod", ["bisa cod", "aman", "gas"], "word"),
     ("transfer", ["aman", "gas", "siap"], "contains"),
-    ("tf", ["aman", "gas", "siap"], "contains"),
+    ("tf", ["aman", "gas", "siap"], "word"),
     ("rekber", ["aman", "gas", "siap"], "contains"),
 
     # ===== BUCIN RINGAN (aman) =====
@@ -357,7 +392,7 @@ CHATREP_RULES = [
     ("sayang", ["ciee", "asek", "wkwk"], "contains"),
     ("bucin", ["ciee", "wkwk", "asek"], "contains"),
     ("ayang", ["ciee", "wkwk", "asek"], "contains"),
-    ("beb", ["ciee", "wkwk", "asek"], "contains"),
+    ("beb", ["ciee", "wkwk", "asek"], "word"),
 
     # ===== KEGIATAN HARIAN (lebih banyak) =====
     ("lagi apa", ["biasa", "ngopi", "rebahan"], "contains"),
@@ -381,14 +416,14 @@ CHATREP_RULES = [
     ("selamat sore", ["sore kak", "gas", "oke"], "contains"),
 
         # ===== TANYAAN / RESPONS CEPET (VARIAN BANYAK) =====
-    ("hah", ["hah", "apaan", "kenapa"], "contains"),
+    ("hah", ["hah", "apaan", "kenapa"], "word"),
     ("hah?", ["hah", "apaan", "kenapa"], "contains"),
     ("hah anjir", ["waduh", "wkwk", "parah"], "contains"),
     ("gitu", ["iya", "oh gitu", "sip"], "contains"),
     ("oh gitu", ["iya", "sip", "oke"], "contains"),
     ("oh gitu ya", ["iya", "sip", "oke"], "contains"),
     ("terus", ["terus kenapa", "lanjut", "gimana"], "contains"),
-    ("trs", ["terus kenapa", "lanjut", "gimana"], "contains"),
+    ("trs", ["terus kenapa", "lanjut", "gimana"], "word"),
     ("trus", ["terus kenapa", "lanjut", "gimana"], "contains"),
     ("jadi", ["jadi gimana", "terus?", "oke"], "contains"),
     ("jadi gimana", ["gatau", "pelan-pelan", "aman"], "contains"),
@@ -419,18 +454,18 @@ CHATREP_RULES = [
     ("sehat", ["sehat dong", "aman", "gas"], "contains"),
     ("sehat?", ["sehat dong", "aman", "gas"], "contains"),
     ("sakit", ["waduh", "gws", "istirahat"], "contains"),
-    ("gws", ["gws", "cepet sembuh", "istirahat"], "contains"),
+    ("gws", ["gws", "cepet sembuh", "istirahat"], "word"),
     ("pusing", ["istirahat", "minum dulu", "waduh"], "contains"),
     ("mual", ["waduh", "istirahat", "minum"], "contains"),
     ("demam", ["waduh", "gws", "istirahat"], "contains"),
     ("batuk", ["minum anget", "gws", "istirahat"], "contains"),
-    ("flu", ["gws", "istirahat", "minum anget"], "contains"),
+    ("flu", ["gws", "istirahat", "minum anget"], "word"),
 
     # ===== NANYA LOKASI / KETEMUAN (VARIAN) =====
     ("lokasi", ["lokasi mana", "shareloc", "dimana"], "contains"),
     ("loks", ["lokasi mana", "shareloc", "dmn"], "contains"),
     ("shareloc", ["shareloc dong", "lok mana", "dmn"], "contains"),
-    ("sini", ["sini mana", "dmn", "lokasi"], "contains"),
+    ("sini", ["sini mana", "dmn", "lokasi"], "word"),
     ("situ", ["situ mana", "dmn", "lokasi"], "contains"),
     ("ketemu", ["gas ketemu", "dmn", "otw"], "contains"),
     ("meet", ["gas ketemu", "dmn", "otw"], "contains"),
@@ -438,10 +473,10 @@ CHATREP_RULES = [
 
     # ===== MABAR / VC / CALL (VARIAN) =====
     ("yuk", ["yuk", "gas", "kuy"], "exact"),
-    ("kuy", ["kuy", "gas", "yuk"], "contains"),
+    ("kuy", ["kuy", "gas", "yuk"], "word"),
     ("skuy", ["skuy", "gas", "yuk"], "contains"),
     ("ayok", ["gas", "yuk", "kuy"], "contains"),
-    ("ayo", ["gas", "yuk", "kuy"], "contains"),
+    ("ayo", ["gas", "yuk", "kuy"], "word"),
     ("ayoo", ["gas", "yuk", "kuy"], "contains"),
     ("gas ga", ["gas", "ayo", "kuy"], "contains"),
     ("gass ga", ["gas", "ayo", "kuy"], "contains"),
@@ -453,15 +488,15 @@ CHATREP_RULES = [
     ("link call", ["mana link", "kirim", "spill"], "contains"),
 
     # ===== SOSMED / LINK / FOLLOW =====
-    ("ig", ["spill ig", "dm aja", "mana ig"], "contains"),
+    ("ig", ["spill ig", "dm aja", "mana ig"], "word"),
     ("instagram", ["spill ig", "dm aja", "mana ig"], "contains"),
     ("tiktok", ["spill tiktok", "mana link", "kirim"], "contains"),
-    ("tt", ["spill tiktok", "mana link", "kirim"], "contains"),
-    ("yt", ["mana link", "spill yt", "kirim"], "contains"),
+    ("tt", ["spill tiktok", "mana link", "kirim"], "word"),
+    ("yt", ["mana link", "spill yt", "kirim"], "word"),
     ("youtube", ["mana link", "spill yt", "kirim"], "contains"),
     ("follow", ["gas follow", "done", "sip"], "contains"),
     ("follback", ["done", "sip", "gas"], "contains"),
-    ("fb", ["done", "sip", "gas"], "contains"),
+    ("fb", ["done", "sip", "gas"], "word"),
     ("like", ["gas", "done", "sip"], "contains"),
     ("komen", ["gas", "done", "sip"], "contains"),
 
@@ -477,7 +512,7 @@ CHATREP_RULES = [
     ("share dong", ["share apa", "mana", "oke"], "contains"),
 
     # ===== REAKSI KAGET / HERAN / MALU =====
-    ("anj", ["waduh", "wkwk", "parah"], "contains"),
+    ("anj", ["waduh", "wkwk", "parah"], "word"),
     ("buset dah", ["parah", "anjir", "waduh"], "contains"),
     ("serius lu", ["beneran", "fix", "serius"], "contains"),
     ("asli", ["asli", "real", "bener"], "contains"),
@@ -524,13 +559,13 @@ CHATREP_RULES = [
         # ===== PANGGILAN RANDOM / TYPO =====
     ("bruh", ["iya bruh", "waduh", "wkwk"], "contains"),
     ("brok", ["iya bro", "apa", "kenapa"], "contains"),
-    ("bng", ["siap bang", "kenapa bang", "apa bang"], "contains"),
-    ("bg", ["siap bang", "kenapa", "apa"], "contains"),
+    ("bng", ["siap bang", "kenapa bang", "apa bang"], "word"),
+    ("bg", ["siap bang", "kenapa", "apa"], "word"),
     ("kkaa", ["iya kak", "kenapa kak", "apa kak"], "contains"),
     ("kakkk", ["iya kak", "kenapa kak", "apa kak"], "contains"),
-    ("minn", ["iya min", "kenapa min", "apa min"], "contains"),
+    ("minn", ["iya min", "kenapa min", "apa min"], "word"),
     ("admin", ["iya min", "kenapa", "apa"], "contains"),
-    ("mod", ["iya min", "kenapa", "apa"], "contains"),
+    ("mod", ["iya min", "kenapa", "apa"], "word"),
     ("owner", ["iya bos", "kenapa", "apa"], "contains"),
 
     # ===== “WKWK” VARIAN + KETAWA SPAM =====
@@ -550,7 +585,7 @@ CHATREP_RULES = [
     ("parah sih", ["parah", "anjir", "waduh"], "contains"),
     ("gokil sih", ["gokil", "mantap", "gas"], "contains"),
     ("mantap jiwa", ["mantap", "gas", "sip"], "contains"),
-    ("bgs", ["bagus", "mantap", "sip"], "contains"),
+    ("bgs", ["bagus", "mantap", "sip"], "word"),
     ("bgus", ["bagus", "mantap", "sip"], "contains"),
     ("kocak", ["wkwk", "ngakak", "lucu"], "contains"),
     ("receh amat", ["wkwk", "ngakak", "yaelah"], "contains"),
@@ -563,17 +598,17 @@ CHATREP_RULES = [
     ("kirim link", ["gas", "spill link", "mana"], "contains"),
     ("kirim file", ["kirim apa", "mana", "spill"], "contains"),
     ("file", ["file apa", "mana file", "kirim"], "contains"),
-    ("dok", ["dok apa", "mana", "kirim"], "contains"),
-    ("doc", ["doc apa", "mana", "kirim"], "contains"),
-    ("apk", ["apk apaan", "mana link", "spill"], "contains"),
+    ("dok", ["dok apa", "mana", "kirim"], "word"),
+    ("doc", ["doc apa", "mana", "kirim"], "word"),
+    ("apk", ["apk apaan", "mana link", "spill"], "word"),
     ("download", ["mana link", "spill", "kirim"], "contains"),
-    ("dl", ["mana link", "spill", "kirim"], "contains"),
+    ("dl", ["mana link", "spill", "kirim"], "word"),
 
     # ===== “JOIN / MASUK / INVITE” VARIAN =====
-    ("inv", ["invite mana", "kirim link", "gas"], "contains"),
+    ("inv", ["invite mana", "kirim link", "gas"], "word"),
     ("invite", ["invite mana", "kirim link", "gas"], "contains"),
     ("undang", ["undang mana", "kirim link", "gas"], "contains"),
-    ("add", ["add kemana", "mana link", "gas"], "contains"),
+    ("add", ["add kemana", "mana link", "gas"], "word"),
     ("masukin", ["gas", "mana link", "invite"], "contains"),
     ("join dong", ["mana link", "gas", "kuy"], "contains"),
     ("ajak", ["ajak kemana", "mana link", "gas"], "contains"),
@@ -605,10 +640,10 @@ CHATREP_RULES = [
     ("gabut banget", ["ngapain", "rebahan", "wkwk"], "contains"),
     ("cape", ["istirahat", "rebahan", "santai"], "contains"),
     ("capek banget", ["istirahat", "rebahan", "santai"], "contains"),
-    ("bt", ["santai", "tarik napas", "waduh"], "contains"),
+    ("bt", ["santai", "tarik napas", "waduh"], "word"),
     ("badmood", ["santai", "tarik napas", "waduh"], "contains"),
     ("pengen", ["pengen apaan", "hah", "wkwk"], "contains"),
-    ("pgn", ["pengen apaan", "hah", "wkwk"], "contains"),
+    ("pgn", ["pengen apaan", "hah", "wkwk"], "word"),
 
     # ===== JAM / WAKTU RANDOM =====
     ("jam berapa", ["gatau", "cek jam sendiri", "wkwk"], "contains"),
@@ -642,154 +677,372 @@ CHATREP_RULES = [
 ]
 
 COOLDOWN_SECONDS = 6
+# batas jumlah key (chat_id, trigger) yang disimpan untuk cooldown
+COOLDOWN_MAX_KEYS = 200_000
+# warmup peer grup aktif saat startup: resolve paralel maksimal N, per batch M chat
+PEER_WARMUP_CONCURRENCY = 8
+PEER_WARMUP_BATCH = 50
+# jumlah pesan terakhir yang diingat untuk deteksi update duplikat
+DEDUP_CAPACITY = 50_000
+# batas memori cache matcher per grup yang punya overlay rules (.rule)
+OVERLAY_CACHE_BYTES = 64 * 1024 * 1024
+# grup OFF yang dicek tidak punya overlay tidak di-query lagi selama N detik (.menu berulang)
+OVERLAY_MISS_SECONDS = 300
+OVERLAY_MISS_MAX_KEYS = 10_000
+# snapshot lokal (SNAPSHOT_PATH) ditulis tiap N detik + saat shutdown; snapshot yang lebih
+# tua dari SNAPSHOT_MAX_AGE detik diabaikan (boot biasa, tunggu Mongo)
+SNAPSHOT_SECONDS = 30
+SNAPSHOT_MAX_AGE = 24 * 3600
+# .menu: jumlah rules per halaman / hasil pencarian
+MENU_PAGE_SIZE = 40
+# rotasi balasan per (chat_id, trigger) dibuang kalau tidak dipakai selama ini (detik);
+# jumlah key dibatasi COOLDOWN_MAX_KEYS juga
+ROTATION_IDLE_SECONDS = 3600
 HUMAN_DELAY_RANGE = (0.2, 0.8)
 REPLY_TO_TRIGGER_MESSAGE = True
-
-# cooldown in-memory
-LAST_SENT: Dict[Tuple[int, str], float] = {}
-
-# cache enabled groups in-memory (loaded from Mongo lazily)
-ACTIVE_CHAT_IDS: Set[int] = set()
-DB_LOADED = False
-DB_LOCK = asyncio.Lock()
-
-# =========================
-# PYROGRAM APP
-# =========================
-app = Client("chatrep_userbot", api_id=API_ID, api_hash=API_HASH)
-
-def dlog(msg: str):
-    if DEBUG:
-        print(msg)
-
-def normalize(text: str) -> str:
-    return (text or "").strip().lower()
-
-def pick_response(resp: Union[str, List[str]]) -> str:
-    if isinstance(resp, (list, tuple)):
-        return random.choice(resp) if resp else ""
-    return str(resp or "")
+# interval polling rules kalau mongod tidak support change stream
+RULES_POLL_SECONDS = 30
+# write-behind chatrep_settings: flush tiap N chat atau tiap X detik
+SETTINGS_FLUSH_BATCH = 200
+SETTINGS_FLUSH_SECONDS = 1.0
+# outbound: rate per chat / global (pesan per detik), balasan lebih tua dari SEND_MAX_AGE dibuang
+SEND_CHAT_RATE = 1 / 3
+SEND_CHAT_BURST = 2
+SEND_GLOBAL_RATE = 5
+SEND_GLOBAL_BURST = 10
+SEND_MAX_AGE = 30
+SEND_MAX_PENDING_PER_CHAT = 3
+# admission / load shedding (pesan per detik per chat, rata-rata ADMIT_WINDOW detik):
+# di atas ADMIT_SAMPLE_RATE cuma ADMIT_SAMPLE bagian yang diproses, di atas ADMIT_DROP_RATE
+# semua dibuang; kalau antrian kirim >= ADMIT_QUEUE_HIGH semua pesan masuk dibuang
+ADMIT_SAMPLE_RATE = 3.0
+ADMIT_DROP_RATE = 15.0
+ADMIT_SAMPLE = 0.2
+ADMIT_WINDOW = 10.0
+ADMIT_QUEUE_HIGH = 500
+
+# waktu boot, untuk log startup / latency pesan pertama
+BOOT_AT = PROFILE.t0
+READY_AT = 0.0
+FIRST_MESSAGE_LOGGED = False
+
+# task background (watch rules / grup aktif, warmup peer): disimpan supaya tidak di-GC
+# di tengah jalan dan bisa di-cancel saat shutdown
+BACKGROUND_TASKS: List[asyncio.Task] = []
+
+# log async (lihat logpipe.py); format + print jalan di thread terpisah
+LOG = LogPipe(level=LEVELS[LOG_LEVEL], sample=LOG_SAMPLE, json_output=LOG_JSON)
+
+def pick_response(rule: Rule, rotations: RotationStore, key) -> str:
+    return rotations.pick(key, rule.responses, rule.weights)
 
 def is_group(m) -> bool:
     return bool(m.chat) and m.chat.type in (ChatType.GROUP, ChatType.SUPERGROUP)
 
-def match(mode: str, trigger: str, incoming: str) -> bool:
-    mode = (mode or "contains").lower()
-    t = normalize(trigger)
-    inc = normalize(incoming)
-    if not t or not inc:
-        return False
-    if mode == "exact":
-        return inc == t
-    return t in inc
-
-async def safe_send(client: Client, chat_id: int, text: str, reply_to: int | None):
-    try:
-        await client.send_message(chat_id, text, reply_to_message_id=reply_to)
-    except FloodWait as e:
-        await asyncio.sleep(int(e.value) + 1)
-        await client.send_message(chat_id, text, reply_to_message_id=reply_to)
-    except RPCError as e:
-        dlog(f"[SEND ERROR] chat={chat_id} err={e}")
-
 # =========================
-# PATCH: skip Peer id invalid (opsi 1)
+# PATCH: Peer id invalid -> resolve peer lalu proses ulang (lihat peers.py)
 # =========================
 from pyrogram.client import Client as PyroClient  # noqa: E402
 _original_handle_updates = PyroClient.handle_updates
+widen_channel_range()
 
 async def _safe_handle_updates(self, updates):
     try:
         return await _original_handle_updates(self, updates)
     except ValueError as e:
-        if "Peer id invalid" in str(e):
-            dlog(f"[WARN] skipped update: {e}")
-            return
-        raise
+        if "Peer id invalid" not in str(e):
+            raise
+        acc = ACCOUNTS.get(self.name)
+        rest = await acc.peers.pending(updates) if acc is not None else None
+        if rest is not None and await acc.peers.recover(rest):
+            try:
+                await _original_handle_updates(self, rest)
+            except ValueError as e2:
+                e = e2
+            else:
+                acc.peers.stats["retried"] += 1
+                UPDATES_RETRIED.inc()
+                LOG.info("PEERS", "update retried after resolve")
+                return
+        if acc is not None:
+            acc.peers.stats["skipped"] += 1
+        UPDATES_SKIPPED.inc()
+        LOG.warn("UPDATE", "skipped update", err=str(e))
 
 PyroClient.handle_updates = _safe_handle_updates
 
 # =========================
-# MONGO
+# MONGO (satu Motor client + satu snapshot rules per proses, dipakai semua akun)
 # =========================
-mongo = AsyncIOMotorClient(MONGO_URL)
-db = mongo[MONGO_DB]
-col = db["chatrep_settings"]
-
-async def ensure_db_loaded():
-    global DB_LOADED
-    if DB_LOADED:
+# Motor client dibuat saat startup (open_mongo), bukan saat import: resolusi SRV
+# mongodb+srv:// + koneksi pertama jalan paralel dengan compile rules
+mongo = None
+db = None
+col = None
+rules_col = None
+# access hash per akun (peers.py), supaya session in-memory tidak resolve ulang dari nol
+peers_col = None
+
+# compiled rules (lihat matcher.py / rules_store.py); default di-compile saat startup
+RULES = RuleStore(rules_col, CHATREP_RULES, poll_seconds=RULES_POLL_SECONDS, log=LOG.log)
+SETTINGS_WRITER = SettingsWriter(col, max_batch=SETTINGS_FLUSH_BATCH,
+                                 flush_interval=SETTINGS_FLUSH_SECONDS, log=LOG.log)
+
+# state cooldown / grup aktif antar instance (lihat state_backend.py); MongoBackend
+# dipasang di open_mongo() kalau STATE_BACKEND=mongo
+STATE = MemoryBackend()
+# di-set setelah STATE.setup() (setup_state); boot dari snapshot dengan STATE_BACKEND=mongo
+# menahan claim cooldown bersama sampai MongoBackend siap, bukan diam-diam melewatinya
+STATE_READY = asyncio.Event()
+
+async def setup_state():
+    await STATE.setup()
+    STATE_READY.set()
+
+def mongo_options() -> dict:
+    opts = {"maxPoolSize": MONGO_POOL_SIZE, "minPoolSize": MONGO_MIN_POOL}
+    if MONGO_TIMEOUT_MS:
+        opts["serverSelectionTimeoutMS"] = MONGO_TIMEOUT_MS
+        opts["connectTimeoutMS"] = MONGO_TIMEOUT_MS
+    if MONGO_SOCKET_TIMEOUT_MS:
+        opts["socketTimeoutMS"] = MONGO_SOCKET_TIMEOUT_MS
+    if MONGO_COMPRESSORS:
+        opts["compressors"] = MONGO_COMPRESSORS
+    return opts
+
+def open_mongo():
+    # sync (resolusi DNS SRV di constructor), dipanggil lewat asyncio.to_thread
+    global mongo, db, col, rules_col, peers_col, STATE
+    from motor.motor_asyncio import AsyncIOMotorClient
+    mongo = AsyncIOMotorClient(MONGO_URL, **mongo_options())
+    db = mongo[MONGO_DB]
+    col = SETTINGS_WRITER.col = db["chatrep_settings"]
+    rules_col = RULES.col = db["chatrep_rules"]
+    peers_col = db["chatrep_peers"]
+    for acc in ACCOUNTS.values():
+        acc.peers.col = peers_col
+    if STATE_BACKEND == "mongo":
+        STATE = MongoBackend(db, col, poll_seconds=RULES_POLL_SECONDS, log=LOG.log)
+
+async def connect_mongo():
+    await asyncio.to_thread(open_mongo)
+    await mongo.admin.command("ping")
+
+# index chatrep_settings / chatrep_peers + explain query hot path (lihat indexes.py);
+# IndexCheckError sengaja tidak ditangkap: boot gagal daripada jalan dengan collection scan
+async def prepare_indexes(accounts: List["Account"]):
+    if not MONGO_CHECK_INDEXES:
         return
-    async with DB_LOCK:
-        if DB_LOADED:
-            return
-        ACTIVE_CHAT_IDS.clear()
-        async for doc in col.find({"enabled": True}, {"_id": 0, "chat_id": 1}):
-            ACTIVE_CHAT_IDS.add(int(doc["chat_id"]))
-        DB_LOADED = True
-        dlog(f"[DB] loaded active chats: {len(ACTIVE_CHAT_IDS)}")
-
-async def set_enabled(chat_id: int, enabled: bool):
-    await ensure_db_loaded()
-    chat_id = int(chat_id)
-    await col.update_one(
-        {"chat_id": chat_id},
-        {"$set": {"chat_id": chat_id, "enabled": bool(enabled), "updated_at": int(time.time())}},
-        upsert=True,
-    )
-    if enabled:
-        ACTIVE_CHAT_IDS.add(chat_id)
-    else:
-        ACTIVE_CHAT_IDS.discard(chat_id)
+    await ensure_indexes(db, log=LOG.log)
+    await check_hot_queries(db, hot_queries(a.key for a in accounts), log=LOG.log)
 
-async def is_enabled(chat_id: int) -> bool:
-    await ensure_db_loaded()
-    return int(chat_id) in ACTIVE_CHAT_IDS
+# =========================
+# ACCOUNTS
+# =========================
+# state per akun (per Client); handler cari akunnya lewat client.name
+ACCOUNTS: Dict[str, "Account"] = {}
+
+class Account:
+    # key = field "account" di chatrep_settings; None untuk akun default
+    # (cocok juga dengan dokumen lama yang belum punya field account)
+    def __init__(self, client: Client, key: str | None = None):
+        self.client = client
+        self.key = key
+        # cooldown in-memory, key (chat_id, rule.id); expire sendiri setelah COOLDOWN_SECONDS
+        self.last_sent = CooldownStore(COOLDOWN_SECONDS, max_keys=COOLDOWN_MAX_KEYS)
+        # rotasi balasan (bag teracak) per key cooldown yang sama
+        self.rotations = RotationStore(COOLDOWN_MAX_KEYS, idle_ttl=ROTATION_IDLE_SECONDS)
+        # cache enabled groups in-memory (di-preload dari Mongo sebelum client.start())
+        self.active_chat_ids: Set[int] = set()
+        self.db_loaded = False
+        # True kalau state di atas diisi dari snapshot lokal (belum tentu sudah dicek ke Mongo)
+        self.restored = False
+        self.db_lock = asyncio.Lock()
+        # semua auto-reply dikirim lewat scheduler (rate limit + FloodWait per chat)
+        self.sender = SendScheduler(
+            client,
+            chat_rate=SEND_CHAT_RATE, chat_burst=SEND_CHAT_BURST,
+            global_rate=SEND_GLOBAL_RATE, global_burst=SEND_GLOBAL_BURST,
+            max_age=SEND_MAX_AGE, max_pending_per_chat=SEND_MAX_PENDING_PER_CHAT,
+            log=LOG.log,
+        )
+        # load shedding di depan matching (lihat admission.py)
+        self.admission = Admission(
+            sample_rate=ADMIT_SAMPLE_RATE, drop_rate=ADMIT_DROP_RATE, sample=ADMIT_SAMPLE,
+            queue_high=ADMIT_QUEUE_HIGH, depth=self.sender.depth, window=ADMIT_WINDOW,
+        )
+        # peer cache: warmup grup aktif + retry update yang peer-nya belum dikenal
+        self.peers = PeerCache(client, peers_col, account=key, concurrency=PEER_WARMUP_CONCURRENCY,
+                               batch=PEER_WARMUP_BATCH, log=LOG.log)
+        # (chat_id, message_id) yang baru diproses, buat buang update duplikat
+        self.recent = RecentMessages(DEDUP_CAPACITY)
+        # rules tambahan / dimatikan per grup (lihat overlays.py)
+        self.overlays = OverlayCache(max_bytes=OVERLAY_CACHE_BYTES)
+        # chat yang dokumennya tidak punya overlay (cache negatif load_overlay)
+        self.overlay_misses = CooldownStore(OVERLAY_MISS_SECONDS, max_keys=OVERLAY_MISS_MAX_KEYS)
+        ACCOUNTS[client.name] = self
+        register_handlers(client)
+
+    async def ensure_db_loaded(self):
+        if self.db_loaded:
+            return
+        async with self.db_lock:
+            if self.db_loaded:
+                return
+            await self.reload_enabled()
+            self.db_loaded = True
+            LOG.info("DB", "loaded active chats", account=self.client.name, count=len(self.active_chat_ids))
+
+    async def reload_enabled(self):
+        active = set()
+        overlays = {}
+        async for doc in col.find({"account": self.key, "enabled": True}, {"_id": 0, "chat_id": 1, "rules": 1}):
+            chat_id = int(doc["chat_id"])
+            active.add(chat_id)
+            overlays[chat_id] = parse_overlay(doc.get("rules"))
+        # .on/.off / .rule yang belum di-flush write-behind tetap menang
+        for (key, chat_id), fields in SETTINGS_WRITER.pending.items():
+            if key != self.key:
+                continue
+            if "enabled" in fields:
+                (active.add if fields["enabled"] else active.discard)(chat_id)
+            if "rules" in fields:
+                overlays[chat_id] = parse_overlay(fields["rules"])
+        self.active_chat_ids = active
+        self.overlays.replace_all((c, o) for c, o in overlays.items() if o is not None)
+
+    # state lokal untuk snapshot.py; cooldown disimpan per trigger (rule.id tidak stabil antar proses)
+    def snapshot(self) -> AccountSnapshot:
+        overlays = {c: overlay_doc(o) for c, o in self.overlays.overlays.items() if c in self.active_chat_ids}
+        ttl = self.last_sent.ttl
+        cooldowns = [(chat_id, rule_key(rid), ttl - age) for (chat_id, rid), age in self.last_sent.dump()]
+        return AccountSnapshot(set(self.active_chat_ids), overlays, cooldowns)
+
+    def restore(self, snap: AccountSnapshot):
+        self.active_chat_ids = set(snap.active)
+        overlays = ((c, parse_overlay(doc)) for c, doc in snap.overlays.items())
+        self.overlays.replace_all((c, o) for c, o in overlays if o is not None)
+        ttl = self.last_sent.ttl
+        self.last_sent.restore(((chat_id, rule_id(trig)), ttl - left) for chat_id, trig, left in snap.cooldowns)
+        self.restored = True
+
+    def set_overlay(self, chat_id: int, overlay: Overlay | None):
+        chat_id = int(chat_id)
+        self.overlays.set(chat_id, overlay)
+        SETTINGS_WRITER.put(chat_id, {"rules": overlay_doc(overlay), "updated_at": int(time.time())},
+                            account=self.key)
+
+    # hot path: grup tanpa overlay langsung dapat matcher global
+    def matcher_for(self, chat_id: int) -> RuleMatcher:
+        return self.overlays.matcher(chat_id, RULES.matcher)
+
+    # reload_enabled cuma memuat overlay grup yang aktif: grup lain diambil dokumennya dulu
+    # sebelum .on / .rule / .menu membaca atau menimpanya (kalau tidak, .rule menghapus
+    # overlay yang tersimpan di Mongo)
+    async def load_overlay(self, chat_id: int) -> Overlay | None:
+        chat_id = int(chat_id)
+        if chat_id in self.active_chat_ids or self.overlays.get(chat_id) is not None or col is None:
+            return self.overlays.get(chat_id)
+        if "rules" in SETTINGS_WRITER.pending.get((self.key, chat_id), {}) or chat_id in self.overlay_misses:
+            return None
+        doc = await col.find_one({"account": self.key, "chat_id": chat_id}, {"_id": 0, "rules": 1})
+        overlay = parse_overlay(doc.get("rules") if doc else None)
+        if overlay is None:
+            self.overlay_misses.claim(chat_id)
+        self.overlays.set(chat_id, overlay)
+        return overlay
+
+    async def set_enabled(self, chat_id: int, enabled: bool):
+        chat_id = int(chat_id)
+        if enabled:
+            await self.load_overlay(chat_id)
+        SETTINGS_WRITER.put(chat_id, {"enabled": bool(enabled), "updated_at": int(time.time())},
+                            account=self.key)
+        if enabled:
+            self.active_chat_ids.add(chat_id)
+        else:
+            self.active_chat_ids.discard(chat_id)
+
+    # hot path: sync, active_chat_ids sudah di-preload sebelum start
+    def is_enabled(self, chat_id: int) -> bool:
+        return int(chat_id) in self.active_chat_ids
+
+# gauge untuk endpoint metrics (total semua akun di proses ini)
+metrics.Gauge("chatrep_active_chats", "Jumlah grup yang ChatRep-nya ON",
+              lambda: sum(len(a.active_chat_ids) for a in ACCOUNTS.values()))
+metrics.Gauge("chatrep_cooldown_keys", "Jumlah key cooldown (LAST_SENT) yang disimpan",
+              lambda: sum(a.last_sent.stats()["live"] for a in ACCOUNTS.values()))
+metrics.CounterFunc("chatrep_cooldown_expired_total", "Key cooldown yang dibuang karena TTL lewat",
+                    lambda: sum(a.last_sent.expired for a in ACCOUNTS.values()))
+metrics.CounterFunc("chatrep_cooldown_evictions_total", "Key cooldown yang dibuang karena batas max_keys",
+                    lambda: sum(a.last_sent.evictions for a in ACCOUNTS.values()))
+metrics.Gauge("chatrep_rotation_keys", "Jumlah rotasi balasan (chat, trigger) yang disimpan",
+              lambda: sum(len(a.rotations) for a in ACCOUNTS.values()))
+metrics.Gauge("chatrep_send_queue_depth", "Balasan yang menunggu dikirim",
+              lambda: sum(a.sender.depth() for a in ACCOUNTS.values()))
+metrics.Gauge("chatrep_send_wait_max_seconds", "Waktu tunggu antrian terlama sejak start",
+              lambda: max((a.sender.stats["wait_max"] for a in ACCOUNTS.values()), default=0.0))
 
 # =========================
 # COMMANDS (OUTGOING)
 # =========================
-@app.on_message(filters.group & filters.outgoing & filters.regex(r"^[./]ping(\s|$)"))
 async def cmd_ping(_, m):
-    await ensure_db_loaded()
-    dlog("[CMD] ping")
+    LOG.debug("CMD", "ping")
     await m.reply_text("pong")
 
-@app.on_message(filters.group & filters.outgoing & filters.regex(r"^[./]id(\s|$)"))
 async def cmd_id(_, m):
-    await ensure_db_loaded()
-    dlog("[CMD] id")
+    LOG.debug("CMD", "id")
     await m.reply_text(f"chat_id: `{m.chat.id}`", quote=True)
 
-@app.on_message(filters.group & filters.outgoing & filters.regex(r"^[./]on(\s|$)"))
-async def cmd_on(_, m):
-    await set_enabled(m.chat.id, True)
-    dlog(f"[CMD] ON chat={m.chat.id} title={m.chat.title}")
+async def cmd_on(client: Client, m):
+    await ACCOUNTS[client.name].set_enabled(m.chat.id, True)
+    LOG.info("CMD", "ON", chat=m.chat.id, title=m.chat.title)
     await m.reply_text("ChatRep ON.")
 
-@app.on_message(filters.group & filters.outgoing & filters.regex(r"^[./]off(\s|$)"))
-async def cmd_off(_, m):
-    await set_enabled(m.chat.id, False)
-    dlog(f"[CMD] OFF chat={m.chat.id} title={m.chat.title}")
+async def cmd_off(client: Client, m):
+    await ACCOUNTS[client.name].set_enabled(m.chat.id, False)
+    LOG.info("CMD", "OFF", chat=m.chat.id, title=m.chat.title)
     await m.reply_text("ChatRep OFF.")
 
-@app.on_message(filters.group & filters.outgoing & filters.regex(r"^[./]status(\s|$)"))
-async def cmd_status(_, m):
-    status = "ON" if await is_enabled(m.chat.id) else "OFF"
-    dlog(f"[CMD] status -> {status}")
+async def cmd_status(client: Client, m):
+    status = "ON" if ACCOUNTS[client.name].is_enabled(m.chat.id) else "OFF"
+    LOG.debug("CMD", "status", status=status)
     await m.reply_text(f"Status ChatRep grup ini: {status}")
 
-@app.on_message(filters.group & filters.outgoing & filters.regex(r"^[./]menu(\s|$)"))
-async def cmd_menu(_, m):
-    status = "ON" if await is_enabled(m.chat.id) else "OFF"
-    # biar ga kepanjangan, tampilkan 60 rules pertama
-    show = CHATREP_RULES[:60]
-    rules = "\n".join(
-        [f"• [{r[2]}] {r[0]} -> {(' | '.join(r[1]) if isinstance(r[1], (list, tuple)) else r[1])}" for r in show]
-    ) or "- (kosong)"
-    if len(CHATREP_RULES) > 60:
-        rules += f"\n\n... dan {len(CHATREP_RULES) - 60} rules lainnya"
-    await m.reply_text(
+# (snapshot RuleMatcher, MenuIndex) terakhir
+_MENU = None
+
+def menu_index() -> MenuIndex:
+    # render ulang cuma kalau snapshot rules sudah ganti
+    global _MENU
+    matcher = RULES.matcher
+    if _MENU is None or _MENU[0] is not matcher:
+        _MENU = (matcher, MenuIndex(matcher.rules, page_size=MENU_PAGE_SIZE))
+    return _MENU[1]
+
+async def cmd_menu(client: Client, m):
+    acc = ACCOUNTS[client.name]
+    status = "ON" if acc.is_enabled(m.chat.id) else "OFF"
+    await acc.load_overlay(m.chat.id)
+    matcher = acc.matcher_for(m.chat.id)
+    # grup dengan overlay: rules global + tambahan grup, tanpa yang dimatikan (tidak di-cache)
+    index = menu_index() if matcher is RULES.matcher else MenuIndex(matcher.rules, page_size=MENU_PAGE_SIZE)
+    parts = (m.text or "").split(None, 1)
+    arg = parts[1].strip() if len(parts) > 1 else ""
+    LOG.debug("CMD", "menu", arg=arg)
+
+    if arg and not arg.isdigit():
+        hits = index.search(arg)
+        shown = hits[:MENU_PAGE_SIZE]
+        rules = "\n".join(index.lines[i] for i in shown) or "- (tidak ada yang cocok)"
+        if len(hits) > len(shown):
+            rules += f"\n\n... dan {len(hits) - len(shown)} rules lainnya, perjelas pencarian"
+        title = f"Rules cocok '{arg}' ({len(hits)}):"
+    else:
+        page, rules = index.page(int(arg) if arg else 1)
+        title = f"Rules (hal {page}/{len(index.pages)}, total {len(index.lines)}):"
+
+    text = (
         "CHATREP USERBOT (MongoDB)\n\n"
         f"Status grup ini : {status}\n"
         f"Cooldown        : {COOLDOWN_SECONDS}s\n\n"
@@ -799,58 +1052,324 @@ async def cmd_menu(_, m):
         "• .on\n"
         "• .off\n"
         "• .status\n"
-        "• .menu\n\n"
-        f"Rules:\n{rules}"
+        "• .menu [halaman | kata]\n"
+        "• .rule (rules khusus grup)\n\n"
+        f"{title}\n{rules}"
     )
+    # lewat scheduler: kena rate limit yang sama dengan auto-reply
+    acc.sender.submit_many(m.chat.id, chunk_text(text), reply_to=m.id, tag=".menu")
+
+RULE_USAGE = (
+    "Rules khusus grup ini:\n"
+    "• .rule -> lihat\n"
+    "• .rule add <trigger> = <balasan 1> | <balasan 2>\n"
+    "• .rule off <trigger>, <trigger> -> matikan rules global\n"
+    "• .rule on <trigger>, <trigger> -> hapus dari add / off\n"
+    "• .rule reset"
+)
+
+async def cmd_rule(client: Client, m):
+    acc = ACCOUNTS[client.name]
+    parts = (m.text or "").split(None, 2)
+    action = parts[1].lower() if len(parts) > 1 else ""
+    arg = parts[2].strip() if len(parts) > 2 else ""
+    cur = await acc.load_overlay(m.chat.id) or Overlay((), frozenset())
+    LOG.info("CMD", "rule", chat=m.chat.id, action=action, arg=arg)
+
+    if action == "add" and "=" in arg:
+        trigger, _, resp = arg.partition("=")
+        trigger = trigger.strip()
+        responses = [r.strip() for r in resp.split("|") if r.strip()]
+        if not trigger or not responses:
+            await m.reply_text(RULE_USAGE)
+            return
+        key = normalize(trigger)
+        add = tuple(r for r in cur.add if normalize(r[0]) != key) + ((trigger, responses, "contains"),)
+        acc.set_overlay(m.chat.id, Overlay(add, cur.off))
+    elif action in ("off", "on") and arg:
+        keys = {normalize(t) for t in arg.split(",") if t.strip()}
+        if action == "off":
+            acc.set_overlay(m.chat.id, Overlay(cur.add, cur.off | keys))
+        else:
+            add = tuple(r for r in cur.add if normalize(r[0]) not in keys)
+            new = Overlay(add, cur.off - keys)
+            acc.set_overlay(m.chat.id, new if new.add or new.off else None)
+    elif action == "reset":
+        acc.set_overlay(m.chat.id, None)
+    elif action:
+        await m.reply_text(RULE_USAGE)
+        return
+
+    cur = acc.overlays.get(m.chat.id)
+    if cur is None:
+        await m.reply_text("Grup ini pakai rules global saja.\n\n" + RULE_USAGE)
+        return
+    lines = [f"• + {t} -> {' | '.join(r) if isinstance(r, (list, tuple)) else r}" for t, r, _m in cur.add]
+    lines += [f"• - {t}" for t in sorted(cur.off)]
+    acc.sender.submit_many(m.chat.id, chunk_text("Rules khusus grup ini:\n" + "\n".join(lines)),
+                           reply_to=m.id, tag=".rule")
 
 # =========================
 # AUTO REPLY (pesan orang lain)
 # =========================
-@app.on_message(filters.group & filters.text & ~filters.outgoing)
 async def chatrep_handler(client: Client, m):
+    global FIRST_MESSAGE_LOGGED
+    acc = ACCOUNTS[client.name]
+    if not FIRST_MESSAGE_LOGGED:
+        FIRST_MESSAGE_LOGGED = True
+        lag = time.time() - m.date.timestamp() if m.date else 0.0
+        print(f"[BOOT] first message {time.perf_counter() - READY_AT:.2f}s after ready, "
+              f"delivered {lag * 1000:.0f}ms after it was sent")
+        PROFILE.mark("first update")
+        if STARTUP_PROFILE:
+            print(PROFILE.report())
+
+    t0 = time.perf_counter()
+    try:
+        await handle_incoming(acc, m)
+    finally:
+        metrics.HANDLER_SECONDS.observe(time.perf_counter() - t0)
+
+async def handle_incoming(acc: Account, m):
     if not is_group(m):
         return
 
-    if not await is_enabled(m.chat.id):
+    if not acc.is_enabled(m.chat.id):
         return
 
-    incoming = m.text or ""
-    if not incoming.strip():
+    # update yang sama bisa datang dua kali (reconnect / retry peer); dicek setelah grup aktif
+    # supaya grup ramai yang OFF / chat privat tidak mendesak keluar entri grup aktif dari ring
+    if acc.recent.seen(m.chat.id, m.id):
+        LOG.debug("DUP", chat=m.chat.id, msg=m.id)
         return
 
-    dlog(f"[IN] chat={m.chat.id} text={incoming[:80]!r}")
+    if not acc.admission.admit(m.chat.id):
+        return
 
-    for trigger, response, mode in CHATREP_RULES:
-        if not match(mode, trigger, incoming):
-            continue
+    incoming = m.text or ""
+    # normalisasi sekali per pesan, view dipakai bersama oleh semua rule
+    view = MessageView(incoming)
+    if not view.text:
+        return
 
-        trig_key = normalize(trigger)
-        key = (m.chat.id, trig_key)
+    LOG.debug("IN", chat=m.chat.id, text=incoming[:80])
 
-        now = time.time()
-        last = LAST_SENT.get(key, 0.0)
-        if now - last < COOLDOWN_SECONDS:
-            dlog(f"[COOLDOWN] chat={m.chat.id} trig={trig_key}")
-            return
-        LAST_SENT[key] = now
+    matcher = acc.matcher_for(m.chat.id)
+    t0 = time.perf_counter()
+    idx = matcher.find_index(view)
+    metrics.MATCH_SECONDS.observe(time.perf_counter() - t0)
+    if idx is None:
+        return
+    rule = matcher.rules[idx]
+
+    trig_key = matcher.keys[idx]
+    key = (m.chat.id, rule.id)
+    metrics.TRIGGER_MATCHES.inc(trig_key)
+
+    claimed = acc.last_sent.claim(key)
+    if claimed and STATE_BACKEND == "mongo":
+        # cooldown lokal lolos; claim juga di backend supaya instance lain tidak ikut balas
+        # (boot dari snapshot: tunggu MongoBackend siap)
+        if not STATE_READY.is_set():
+            await STATE_READY.wait()
+        claimed = await STATE.claim_cooldown(acc.key, m.chat.id, trig_key, COOLDOWN_SECONDS)
+    if not claimed:
+        metrics.TRIGGER_COOLDOWNS.inc(trig_key)
+        LOG.debug("COOLDOWN", chat=m.chat.id, trig=trig_key)
+        return
 
-        d0, d1 = HUMAN_DELAY_RANGE
-        if d1 > 0:
-            await asyncio.sleep(random.uniform(d0, d1))
+    reply_to = m.id if REPLY_TO_TRIGGER_MESSAGE else None
+    out = pick_response(rule, acc.rotations, key)
+    if not out.strip():
+        return
 
-        reply_to = m.id if REPLY_TO_TRIGGER_MESSAGE else None
-        out = pick_response(response)
-        if not out.strip():
-            return
+    # jeda "manusia" ditangani timer di sender, handler langsung selesai
+    d0, d1 = HUMAN_DELAY_RANGE
+    delay = random.uniform(d0, d1) if d1 > 0 else 0.0
+
+    LOG.debug("MATCH", "-> send", chat=m.chat.id, trig=trig_key)
+    acc.sender.submit(m.chat.id, out, reply_to=reply_to,
+                      msg_time=m.date.timestamp() if m.date else None, delay=delay, tag=trig_key)
+
+def register_handlers(client: Client):
+    for fn, flt in (
+        (cmd_ping, filters.group & filters.outgoing & filters.regex(r"^[./]ping(\s|$)")),
+        (cmd_id, filters.group & filters.outgoing & filters.regex(r"^[./]id(\s|$)")),
+        (cmd_on, filters.group & filters.outgoing & filters.regex(r"^[./]on(\s|$)")),
+        (cmd_off, filters.group & filters.outgoing & filters.regex(r"^[./]off(\s|$)")),
+        (cmd_status, filters.group & filters.outgoing & filters.regex(r"^[./]status(\s|$)")),
+        (cmd_menu, filters.group & filters.outgoing & filters.regex(r"^[./]menu(\s|$)")),
+        (cmd_rule, filters.group & filters.outgoing & filters.regex(r"^[./]rule(\s|$)")),
+        (chatrep_handler, filters.group & filters.text & ~filters.outgoing),
+    ):
+        client.add_handler(MessageHandler(fn, flt))
 
-        dlog(f"[MATCH] chat={m.chat.id} trig={trig_key} -> send")
-        await safe_send(client, m.chat.id, out, reply_to=reply_to)
-        return
+# =========================
+# PYROGRAM APP (akun default)
+# =========================
+# PYRO_WORKERS=0: jumlah worker default pyrogram
+CLIENT_OPTIONS = {"workers": PYRO_WORKERS} if PYRO_WORKERS else {}
+
+app = Client("chatrep_userbot", api_id=API_ID, api_hash=API_HASH, **CLIENT_OPTIONS)
+ACCOUNT = Account(app)
+
+# akun dari file sessions (mode supervisor, lihat supervisor.py)
+def make_account(cfg: dict) -> Account:
+    name = str(cfg["name"])
+    client = Client(
+        name,
+        api_id=int(cfg.get("api_id") or API_ID),
+        api_hash=str(cfg.get("api_hash") or API_HASH),
+        session_string=cfg.get("session_string"),
+        workdir=str(cfg.get("workdir") or "."),
+        **CLIENT_OPTIONS,
+    )
+    return Account(client, key=str(cfg.get("key") or name))
 
 # =========================
 # RUN
 # =========================
+# perubahan chatrep_settings dari instance lain (STATE_BACKEND=mongo)
+def on_enabled_change(key: str | None, chat_id: int, enabled: bool, rules: dict | None = None):
+    # field yang masih pending di write-behind (.on/.off / .rule lokal) tidak ditimpa echo
+    # flush lama dari instance ini sendiri, sama seperti reload_enabled
+    pending = SETTINGS_WRITER.pending.get((key, chat_id), {})
+    for acc in ACCOUNTS.values():
+        if acc.key != key:
+            continue
+        if "enabled" not in pending:
+            if enabled:
+                acc.active_chat_ids.add(chat_id)
+            else:
+                acc.active_chat_ids.discard(chat_id)
+        if "rules" not in pending:
+            acc.overlays.set(chat_id, parse_overlay(rules))
+
+async def warm_peers(acc: Account):
+    # jalan di background: handler sudah aktif, update yang gagal tetap di-retry
+    await acc.peers.load()
+    await acc.peers.warm(list(acc.active_chat_ids))
+
+# isi state akun dari snapshot lokal; True kalau semua akun ada di snapshot (boot tanpa tunggu Mongo)
+def restore_snapshot(accounts: List[Account], path: str) -> bool:
+    if not path:
+        return False
+    snaps = load_snapshot(path, max_age=SNAPSHOT_MAX_AGE)
+    for a in accounts:
+        if a.key in snaps:
+            a.restore(snaps[a.key])
+    PROFILE.mark("snapshot load")
+    return bool(snaps) and all(a.restored for a in accounts)
+
+def write_snapshot(accounts: List[Account], path: str):
+    # akun yang belum pernah load (Mongo gagal, tanpa snapshot) tidak ditulis: state-nya kosong
+    state = {a.key: a.snapshot() for a in accounts if a.db_loaded or a.restored}
+    if state:
+        save_snapshot(path, state)
+
+async def snapshot_loop(accounts: List[Account], path: str):
+    while True:
+        await asyncio.sleep(SNAPSHOT_SECONDS)
+        state = {a.key: a.snapshot() for a in accounts if a.db_loaded or a.restored}
+        if not state:
+            continue
+        try:
+            await asyncio.to_thread(save_snapshot, path, state)
+        except (OSError, sqlite3.Error) as e:
+            LOG.warn("SNAPSHOT", "write failed", err=str(e))
+
+async def load_db(accounts: List[Account]):
+    await PROFILE.timed("mongo indexes", prepare_indexes(accounts))
+    t0 = time.perf_counter()
+    # akun dari snapshot: reload_enabled menimpa grup aktif / overlay dengan isi Mongo
+    await asyncio.gather(RULES.load(), setup_state(), *(a.ensure_db_loaded() for a in accounts))
+    t1 = time.perf_counter()
+    PROFILE.mark("mongo preload")
+    BACKGROUND_TASKS.append(asyncio.create_task(RULES.watch()))
+    BACKGROUND_TASKS.append(asyncio.create_task(STATE.watch_enabled(
+        on_enabled_change, lambda: asyncio.gather(*(a.reload_enabled() for a in accounts)))))
+    SETTINGS_WRITER.start()
+    active = sum(len(a.active_chat_ids) for a in accounts)
+    print(f"[BOOT] preload {(t1 - t0) * 1000:.0f}ms ({len(accounts)} accounts, {active} active chats)")
+
+async def reconcile_db(accounts: List[Account], connect):
+    await connect
+    await load_db(accounts)
+
+async def run_accounts(accounts: List[Account], metrics_port: int = METRICS_PORT,
+                       snapshot_path: str = SNAPSHOT_PATH):
+    global READY_AT
+    warm = restore_snapshot(accounts, snapshot_path)
+    compile_rules = PROFILE.timed("rule compile", asyncio.to_thread(RULES.compile_defaults))
+    connect = PROFILE.timed("mongo connect", connect_mongo())
+    db_task = None
+    if warm:
+        # grup aktif + cooldown sudah dari snapshot: handler jalan dulu, Mongo menyusul
+        await compile_rules
+        db_task = asyncio.create_task(reconcile_db(accounts, connect))
+    else:
+        await asyncio.gather(compile_rules, connect)
+        await load_db(accounts)
+    metrics_server = None
+    if metrics_port:
+        metrics_server = await metrics.serve(metrics_port)
+        print(f"[BOOT] metrics on http://127.0.0.1:{metrics_port}/metrics")
+    await asyncio.gather(*(a.client.start() for a in accounts))
+    READY_AT = time.perf_counter()
+    PROFILE.mark("session start")
+    workers = getattr(accounts[0].client, "workers", PYRO_WORKERS or "default")
+    print(f"[BOOT] ready {READY_AT - BOOT_AT:.2f}s after boot "
+          f"({'snapshot, Mongo reconcile in background' if warm else 'Mongo preloaded'}; "
+          f"loop={LOOP_NAME}, workers={workers}, mongo pool={MONGO_POOL_SIZE})")
+    snap_task = asyncio.create_task(snapshot_loop(accounts, snapshot_path)) if snapshot_path else None
+    try:
+        if db_task is not None:
+            # sengaja di-await: error Mongo (mis. IndexCheckError) tetap menghentikan proses
+            await db_task
+        BACKGROUND_TASKS.extend(asyncio.create_task(warm_peers(a)) for a in accounts)
+        if STARTUP_PROFILE:
+            print(PROFILE.report())
+        await idle()
+    finally:
+        tasks = [t for t in (snap_task, db_task, *BACKGROUND_TASKS) if t is not None]
+        BACKGROUND_TASKS.clear()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(a.sender.close() for a in accounts))
+        if snapshot_path:
+            try:
+                write_snapshot(accounts, snapshot_path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[SNAPSHOT] write failed: {e}")
+        await asyncio.gather(*(a.client.stop() for a in accounts if a.client.is_connected))
+        await SETTINGS_WRITER.close()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+        LOG.close()
+
+async def main():
+    await run_accounts([ACCOUNT])
+
+# dipanggil di proses worker supervisor: banyak akun di satu event loop
+def run_worker(index: int, configs: List[dict]):
+    # akun default tidak dijalankan di worker: lepas supaya session bernama sama tidak bentrok
+    if ACCOUNTS.get(app.name) is ACCOUNT:
+        del ACCOUNTS[app.name]
+    accounts = [make_account(cfg) for cfg in configs]
+    port = METRICS_PORT + 1 + index if METRICS_PORT else 0
+    root, ext = os.path.splitext(SNAPSHOT_PATH)
+    snapshot_path = f"{root}.{index}{ext}" if SNAPSHOT_PATH else ""
+    print(f"[WORKER {index}] {len(accounts)} accounts: {', '.join(a.client.name for a in accounts)}")
+    asyncio.get_event_loop().run_until_complete(
+        run_accounts(accounts, metrics_port=port, snapshot_path=snapshot_path))
+
+PROFILE.mark("module init")
+
 if __name__ == "__main__":
+    if not API_ID or not API_HASH:
+        raise SystemExit("API_ID / API_HASH belum diset di .env")
     print("Running ChatRep userbot (MongoDB persistence)...")
     print("Test: .ping di grup harus dibales pong")
-    app.run()
+    app.run(main())
@@ -0,0 +1,316 @@
+import re
+import sys
+from enum import IntEnum
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from rotation import weights_of
+
+# Rule engine: rules dikompilasi sekali, lalu tiap pesan cukup di-scan satu kali.
+#   - exact    -> hash lookup (dict)
+#   - contains -> Aho-Corasick automaton
+#   - word     -> hash lookup per token / urutan token (trigger harus utuh sebagai kata)
+#   - regex    -> satu pattern gabungan sebagai prefilter, lalu cek per rule sesuai urutan
+# Prioritas tetap sama seperti loop lama: rule paling atas yang match menang.
+#
+# Pesan dinormalisasi sekali jadi MessageView (casefold, token, offset kata) dan view
+# itu dipakai bersama oleh semua rule. Kalau teks asli tidak match apa pun, dicoba lagi
+# versi "collapsed" (huruf berulang dipadatkan: "haiii" -> "hai", "wkwkwkwk" -> "wkwk"),
+# jadi varian ketikan ikut match tanpa menambah rules.
+#
+# RuleMatcher immutable: perubahan rules bikin snapshot baru lewat patched(),
+# yang memakai ulang trie + fail link kalau set pattern contains tidak berubah.
+#
+# Rules dibekukan sekali jadi tabel Rule (NamedTuple, tanpa __dict__): response selalu
+# tuple, string di-intern, mode jadi IntEnum, dan tiap trigger dapat id integer yang
+# stabil antar reload untuk key cooldown / rotasi.
+
+NO_MATCH = 1 << 62
+
+_RUN = re.compile(r"(.)\1+")
+_REPEAT2 = re.compile(r"(..)\1{2,}")
+_WORD = re.compile(r"\w+")
+
+# trigger yang berubah karena collapse baru dipakai kalau hasilnya masih sepanjang ini
+# ("ss" -> "s" akan match hampir semua pesan)
+MIN_COLLAPSED_TRIGGER = 3
+
+
+def normalize(text: str) -> str:
+    return (text or "").strip().casefold()
+
+
+def words(text: str) -> Tuple[str, ...]:
+    return tuple(_WORD.findall(text))
+
+
+def collapse(text: str) -> str:
+    return _REPEAT2.sub(r"\1\1", _RUN.sub(r"\1", text))
+
+
+class Mode(IntEnum):
+    CONTAINS = 0
+    EXACT = 1
+    WORD = 2
+    REGEX = 3
+
+    @classmethod
+    def parse(cls, value: Union[str, int, None]) -> "Mode":
+        if isinstance(value, int):
+            return cls(value)
+        return cls.__members__.get(str(value or "").strip().upper(), cls.CONTAINS)
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+
+class Rule(NamedTuple):
+    trigger: str
+    responses: Tuple[str, ...]
+    mode: Mode
+    # id integer per trigger (normalized), dipakai sebagai key cooldown
+    id: int
+    # None kalau semua bobot 1
+    weights: Optional[Tuple[int, ...]]
+
+
+# trigger normalized -> id; hanya bertambah, jadi id tetap sama walaupun rules di-reload
+# (tapi tidak antar proses: snapshot cooldown menyimpan trigger-nya, lihat rule_key)
+_RULE_IDS: Dict[str, int] = {}
+_RULE_KEYS: List[str] = []
+
+
+def rule_id(key: str) -> int:
+    rid = _RULE_IDS.get(key)
+    if rid is None:
+        rid = _RULE_IDS[key] = len(_RULE_IDS)
+        _RULE_KEYS.append(key)
+    return rid
+
+
+def rule_key(rid: int) -> str:
+    return _RULE_KEYS[rid]
+
+
+def freeze(rule: Sequence) -> Rule:
+    if isinstance(rule, Rule):
+        return rule
+    trigger, response, mode = rule[0], rule[1], rule[2]
+    trigger = sys.intern(str(trigger or ""))
+    items = response if isinstance(response, (list, tuple)) else (response,) if response else ()
+    responses = tuple(
+        sys.intern(str(item[0] if isinstance(item, (list, tuple)) else item or "")) for item in items
+    )
+    weights = weights_of(items)
+    if all(w == 1 for w in weights):
+        weights = None
+    return Rule(trigger, responses, Mode.parse(mode), rule_id(sys.intern(normalize(trigger))), weights)
+
+
+class MessageView:
+    # view immutable untuk satu pesan; bagian yang mahal dihitung sekali saat pertama dipakai
+    __slots__ = ("raw", "text", "_collapsed", "_tokens", "_spans")
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.text = normalize(raw)
+        self._collapsed: Optional[str] = None
+        self._tokens: Optional[Tuple[str, ...]] = None
+        self._spans: Optional[Tuple[Tuple[int, int], ...]] = None
+
+    @property
+    def collapsed(self) -> str:
+        if self._collapsed is None:
+            self._collapsed = collapse(self.text)
+        return self._collapsed
+
+    def _split(self):
+        found = [(m.group(), m.span()) for m in _WORD.finditer(self.text)]
+        self._tokens = tuple(t for t, _ in found)
+        self._spans = tuple(s for _, s in found)
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        if self._tokens is None:
+            self._split()
+        return self._tokens
+
+    @property
+    def spans(self) -> Tuple[Tuple[int, int], ...]:
+        if self._spans is None:
+            self._split()
+        return self._spans
+
+
+def prepare(text: Union[str, MessageView]) -> MessageView:
+    return text if isinstance(text, MessageView) else MessageView(text)
+
+
+class _Index:
+    # exact dict + automaton contains + lookup word untuk satu bentuk teks (asli / collapsed)
+    def __init__(self, exact: Dict[str, int], contains: Dict[str, int],
+                 word: Dict[Tuple[str, ...], int], base: "_Index | None"):
+        self.exact = exact
+        self.word1 = {k[0]: idx for k, idx in word.items() if len(k) == 1}
+        self.wordn = {k: idx for k, idx in word.items() if len(k) > 1}
+        self.wordn_max = max((len(k) for k in self.wordn), default=0)
+        self.patterns = frozenset(contains)
+        if base is not None and base.patterns == self.patterns:
+            # struktur automaton cuma bergantung ke set pattern -> share
+            self.goto, self.fail = base.goto, base.fail
+            self.terminal, self.bfs = base.terminal, base.bfs
+        else:
+            self._build_automaton(contains)
+        self.best = self._build_best(contains)
+
+    def _build_automaton(self, contains: Dict[str, int]):
+        # goto[state] = {char: next_state}, fail[state], terminal[pattern] = state
+        goto: List[Dict[str, int]] = [{}]
+        terminal: Dict[str, int] = {}
+        for pattern in contains:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                state = nxt
+            terminal[pattern] = state
+
+        fail = [0] * len(goto)
+        bfs = list(goto[0].values())
+        i = 0
+        while i < len(bfs):
+            state = bfs[i]
+            i += 1
+            for ch, nxt in goto[state].items():
+                bfs.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[nxt] = f if f != nxt else 0
+
+        self.goto, self.fail, self.terminal, self.bfs = goto, fail, terminal, bfs
+
+    def _build_best(self, contains: Dict[str, int]) -> List[int]:
+        # best[state] = index rule terkecil yang match kalau automaton ada di state ini
+        best = [NO_MATCH] * len(self.goto)
+        for pattern, idx in contains.items():
+            best[self.terminal[pattern]] = idx
+        fail = self.fail
+        for state in self.bfs:  # urutan BFS: best[fail] selalu sudah final
+            f = best[fail[state]]
+            if f < best[state]:
+                best[state] = f
+        return best
+
+    def search(self, inc: str, tokens: Tuple[str, ...] = ()) -> int:
+        found = self.exact.get(inc, NO_MATCH)
+
+        if self.word1:
+            word1 = self.word1
+            for tok in tokens:
+                idx = word1.get(tok, NO_MATCH)
+                if idx < found:
+                    found = idx
+        if self.wordn:
+            wordn, n_max = self.wordn, self.wordn_max
+            for i in range(len(tokens) - 1):
+                for n in range(2, min(n_max, len(tokens) - i) + 1):
+                    idx = wordn.get(tokens[i:i + n], NO_MATCH)
+                    if idx < found:
+                        found = idx
+
+        goto, fail, best = self.goto, self.fail, self.best
+        state = 0
+        for ch in inc:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            b = best[state]
+            if b < found:
+                found = b
+                if found == 0:
+                    break
+        return found
+
+
+class RuleMatcher:
+    def __init__(self, rules: Sequence[Tuple], base: "RuleMatcher | None" = None):
+        self.rules: Tuple[Rule, ...] = tuple(freeze(r) for r in rules)
+        # trigger yang sudah dinormalisasi (key cooldown shared / label metrics)
+        self.keys: List[str] = []
+        # rule regex yang pattern-nya tidak valid: (index, trigger, error)
+        self.invalid: List[Tuple[int, str, str]] = []
+        plain: Tuple[dict, dict, dict] = ({}, {}, {})
+        loose: Tuple[dict, dict, dict] = ({}, {}, {})
+        regexes: List[Tuple[int, "re.Pattern"]] = []
+        for idx, (trigger, _responses, mode, _rid, _weights) in enumerate(self.rules):
+            t = sys.intern(normalize(trigger))
+            self.keys.append(t)
+            if not t:
+                continue
+            if mode == Mode.REGEX:
+                try:
+                    regexes.append((idx, re.compile(str(trigger).strip(), re.IGNORECASE)))
+                except re.error as e:
+                    self.invalid.append((idx, str(trigger), str(e)))
+                continue
+            slot = 0 if mode == Mode.EXACT else 2 if mode == Mode.WORD else 1
+            key = words(t) if slot == 2 else t
+            if not key:
+                continue
+            plain[slot].setdefault(key, idx)
+            c = collapse(t)
+            if c == t or len(c) >= MIN_COLLAPSED_TRIGGER:
+                loose[slot].setdefault(words(c) if slot == 2 else c, idx)
+
+        self.plain = _Index(*plain, base.plain if base else None)
+        self.loose = _Index(*loose, base.loose if base else None)
+        self.has_words = bool(plain[2])
+
+        self.regexes = regexes
+        self.regex_any: "re.Pattern | None" = None
+        # prefilter gabungan cuma kalau tidak ada pattern yang punya group: digabung, nomor
+        # group bergeser dan backreference (\1) menunjuk group yang salah
+        if regexes and all(rx.groups == 0 for _idx, rx in regexes):
+            try:
+                self.regex_any = re.compile("|".join(f"(?:{rx.pattern})" for _idx, rx in regexes),
+                                            re.IGNORECASE)
+            except re.error:
+                # mis. inline flag di tengah pattern: tanpa prefilter, cek satu-satu
+                self.regex_any = None
+
+    def patched(self, rules: Sequence[Tuple]) -> "RuleMatcher":
+        return RuleMatcher(rules, base=self)
+
+    def _search_regex(self, text: str, found: int) -> int:
+        regexes = self.regexes
+        if regexes[0][0] >= found:
+            return found
+        if self.regex_any is not None and self.regex_any.search(text) is None:
+            return found
+        for idx, rx in regexes:
+            if idx >= found:
+                break
+            if rx.search(text):
+                return idx
+        return found
+
+    def find_index(self, text: Union[str, MessageView]) -> Optional[int]:
+        view = prepare(text)
+        if not view.text:
+            return None
+        found = self.plain.search(view.text, view.tokens if self.has_words else ())
+        if self.regexes:
+            found = self._search_regex(view.text, found)
+        if found == NO_MATCH:
+            loose = view.collapsed
+            if loose != view.text:
+                found = self.loose.search(loose, words(loose) if self.has_words else ())
+        return None if found == NO_MATCH else found
+
+    def find(self, text: Union[str, MessageView]) -> Optional[Rule]:
+        idx = self.find_index(text)
+        return None if idx is None else self.rules[idx]
@@ -0,0 +1,79 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from matcher import Rule, normalize, words
+
+# Teks .menu di-render sekali per snapshot rules (MenuIndex dibuat ulang hanya kalau
+# RuleMatcher-nya ganti), lalu dipakai untuk:
+#   .menu          -> halaman 1
+#   .menu <n>      -> halaman n
+#   .menu <cari>   -> rules yang trigger / response-nya mengandung kata berawalan <cari>
+# Pencarian lewat inverted index token -> index rule; vocab disimpan terurut supaya
+# prefix cukup dicari dengan bisect.
+
+# batas panjang satu pesan Telegram
+TELEGRAM_MAX_TEXT = 4096
+
+
+def chunk_text(text: str, limit: int = TELEGRAM_MAX_TEXT) -> List[str]:
+    # pecah per baris supaya satu rule tidak terbelah di dua pesan
+    chunks: List[str] = []
+    cur: List[str] = []
+    size = 0
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if cur:
+                chunks.append("\n".join(cur))
+                cur, size = [], 0
+            chunks.append(line[:limit])
+            line = line[limit:]
+        extra = len(line) + (1 if cur else 0)
+        if cur and size + extra > limit:
+            chunks.append("\n".join(cur))
+            cur, size, extra = [], 0, len(line)
+        cur.append(line)
+        size += extra
+    if cur:
+        chunks.append("\n".join(cur))
+    return chunks
+
+
+def render_rule(rule: Rule) -> str:
+    return f"• [{rule.mode}] {rule.trigger} -> {' | '.join(rule.responses)}"
+
+
+class MenuIndex:
+    def __init__(self, rules: Sequence[Rule], page_size: int = 40):
+        self.page_size = page_size
+        self.lines = [render_rule(r) for r in rules]
+        self.pages = [
+            "\n".join(self.lines[i:i + page_size]) for i in range(0, len(self.lines), page_size)
+        ] or ["- (kosong)"]
+        postings: Dict[str, Set[int]] = {}
+        for idx, rule in enumerate(rules):
+            for tok in words(normalize(" ".join((rule.trigger,) + rule.responses))):
+                postings.setdefault(tok, set()).add(idx)
+        self.vocab = sorted(postings)
+        self.postings = postings
+
+    def page(self, n: int) -> Tuple[int, str]:
+        n = min(max(1, n), len(self.pages))
+        return n, self.pages[n - 1]
+
+    def _prefix(self, token: str) -> Set[int]:
+        found: Set[int] = set()
+        vocab = self.vocab
+        i = bisect_left(vocab, token)
+        while i < len(vocab) and vocab[i].startswith(token):
+            found |= self.postings[vocab[i]]
+            i += 1
+        return found
+
+    def search(self, query: str) -> List[int]:
+        hits: Optional[Set[int]] = None
+        for tok in words(normalize(query)):
+            found = self._prefix(tok)
+            hits = found if hits is None else hits & found
+            if not hits:
+                return []
+        return sorted(hits or ())
@@ -0,0 +1,157 @@
+import asyncio
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Metrics format Prometheus (text exposition 0.0.4) tanpa dependency tambahan.
+# Endpoint HTTP opsional, cuma bind ke localhost: GET /metrics
+
+# client yang connect tapi tidak mengirim request diputus setelah sekian detik
+READ_TIMEOUT = 5.0
+
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+REGISTRY: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        REGISTRY.append(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        ...
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        super().__init__(name, help)
+        self.label = label
+        self.values: Dict[str, float] = {}
+
+    def inc(self, label_value: str = "", n: float = 1):
+        self.values[label_value] = self.values.get(label_value, 0) + n
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        if self.label is None:
+            lines.append(f"{self.name} {_num(self.values.get('', 0))}")
+        else:
+            for lv, v in sorted(self.values.items()):
+                lines.append(f'{self.name}{{{self.label}="{_escape(lv)}"}} {_num(v)}')
+        return lines
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float]):
+        super().__init__(name, help)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        return self.header() + [f"{self.name} {_num(self.fn())}"]
+
+
+class CounterFunc(Gauge):
+    # counter yang nilainya dibaca saat scrape dari objek lain (mis. CooldownStore.expired)
+    kind = "counter"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        acc = 0
+        for le, c in zip(self.buckets, self.counts):
+            acc += c
+            lines.append(f'{self.name}_bucket{{le="{_num(le)}"}} {acc}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {_num(self.sum)}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+def render() -> str:
+    lines: List[str] = []
+    for m in REGISTRY:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ===== metric hot path =====
+MATCH_SECONDS = Histogram("chatrep_match_seconds", "Waktu rule matching per pesan")
+HANDLER_SECONDS = Histogram("chatrep_handler_seconds", "Durasi chatrep_handler per pesan")
+SEND_SECONDS = Histogram("chatrep_send_seconds", "Latency send_message ke Telegram")
+TRIGGER_MATCHES = Counter("chatrep_trigger_matches_total", "Pesan yang match per trigger", "trigger")
+TRIGGER_COOLDOWNS = Counter("chatrep_trigger_cooldown_total", "Match yang ditahan cooldown per trigger", "trigger")
+TRIGGER_SENDS = Counter("chatrep_trigger_sends_total", "Balasan terkirim per trigger", "trigger")
+FLOODWAITS = Counter("chatrep_floodwait_total", "Jumlah FloodWait dari Telegram")
+FLOODWAIT_SECONDS = Counter("chatrep_floodwait_seconds_total", "Total detik pause karena FloodWait")
+SEND_DROPPED = Counter("chatrep_send_dropped_total", "Balasan yang dibuang sebelum dikirim per alasan (stale / overflow)",
+                       "reason")
+SEND_ERRORS = Counter("chatrep_send_errors_total", "send_message yang gagal (selain FloodWait)")
+SEND_WAIT_SECONDS = Histogram("chatrep_send_wait_seconds", "Waktu balasan menunggu di antrian sampai terkirim",
+                              (0.01, 0.1, 0.5, 1, 2, 5, 10, 20, 30, 60))
+
+
+async def _read_request(reader: asyncio.StreamReader) -> bytes:
+    request = await reader.readline()
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+    return request
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await asyncio.wait_for(_read_request(reader), READ_TIMEOUT)
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(port: int, host: str = "127.0.0.1") -> asyncio.AbstractServer:
+    return await asyncio.start_server(_handle, host, port)
@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+from matcher import RuleMatcher, normalize
+
+# Rules tambahan / yang dimatikan per grup, disimpan di dokumen chatrep_settings grup itu:
+#   "rules": {"add": [{"trigger": str, "response": str | list, "mode": str}, ...],
+#             "off": [trigger, ...]}
+# Rule "add" diprioritaskan di atas rules global; trigger di "off" tidak dipakai di grup itu.
+#
+# Grup tanpa overlay langsung memakai matcher global (automaton yang sama, tanpa copy).
+# Matcher global+overlay di-compile saat pertama dibutuhkan, disimpan di LRU yang dibatasi
+# perkiraan ukuran memori, dan dibuang kalau overlay grupnya berubah atau rules global ganti.
+
+# perkiraan byte per state automaton (tracemalloc, rules default): automaton sendiri vs
+# cuma tabel best[] kalau trie-nya dipakai bersama dengan matcher global
+BYTES_PER_STATE = 240
+BYTES_PER_SHARED_STATE = 30
+
+
+class Overlay(NamedTuple):
+    add: Tuple[Tuple, ...]
+    off: FrozenSet[str]
+
+
+def parse_overlay(doc: Optional[dict]) -> Optional[Overlay]:
+    if not doc:
+        return None
+    add = tuple(
+        (str(r.get("trigger") or ""), r.get("response") or "", str(r.get("mode") or "contains"))
+        for r in doc.get("add") or () if isinstance(r, dict) and r.get("trigger")
+    )
+    off = frozenset(normalize(t) for t in doc.get("off") or () if t)
+    if not add and not off:
+        return None
+    return Overlay(add, off)
+
+
+def overlay_doc(overlay: Optional[Overlay]) -> dict:
+    if overlay is None:
+        return {}
+    return {
+        "add": [{"trigger": t, "response": list(r) if isinstance(r, (list, tuple)) else r, "mode": m}
+                for t, r, m in overlay.add],
+        "off": sorted(overlay.off),
+    }
+
+
+def estimate_size(matcher: RuleMatcher, base: RuleMatcher) -> int:
+    size = 0
+    for idx, base_idx in ((matcher.plain, base.plain), (matcher.loose, base.loose)):
+        per_state = BYTES_PER_SHARED_STATE if idx.goto is base_idx.goto else BYTES_PER_STATE
+        size += per_state * len(idx.goto)
+    return size + 64 * len(matcher.rules)
+
+
+class OverlayCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.overlays: Dict[int, Overlay] = {}
+        # chat_id -> (matcher global saat compile, matcher chat, ukuran)
+        self._cache: "OrderedDict[int, Tuple[RuleMatcher, RuleMatcher, int]]" = OrderedDict()
+        self.bytes = 0
+        self.builds = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, chat_id: int) -> Optional[Overlay]:
+        return self.overlays.get(chat_id)
+
+    def set(self, chat_id: int, overlay: Optional[Overlay]):
+        if overlay is None:
+            if self.overlays.pop(chat_id, None) is None:
+                return
+        elif self.overlays.get(chat_id) == overlay:
+            return
+        else:
+            self.overlays[chat_id] = overlay
+        self.invalidate(chat_id)
+
+    def replace_all(self, overlays: Iterable[Tuple[int, Overlay]]):
+        new = dict(overlays)
+        for chat_id in set(self.overlays) | set(new):
+            self.set(chat_id, new.get(chat_id))
+
+    def invalidate(self, chat_id: int):
+        entry = self._cache.pop(chat_id, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def matcher(self, chat_id: int, base: RuleMatcher) -> RuleMatcher:
+        overlay = self.overlays.get(chat_id)
+        if overlay is None:
+            return base
+        entry = self._cache.get(chat_id)
+        if entry is not None and entry[0] is base:
+            self._cache.move_to_end(chat_id)
+            return entry[1]
+        if entry is not None:
+            self.invalidate(chat_id)
+
+        off = overlay.off
+        rules = list(overlay.add) + [r for r, key in zip(base.rules, base.keys) if key not in off]
+        matcher = base.patched(rules)
+        size = estimate_size(matcher, base)
+        self.builds += 1
+        self._cache[chat_id] = (base, matcher, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self._cache) > 1:
+            _chat, (_b, _m, evicted) = self._cache.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+        return matcher
@@ -0,0 +1,203 @@
+import asyncio
+import copy
+import time
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from pyrogram import utils
+from pyrogram.errors import RPCError
+
+from logpipe import INFO, WARN, print_log
+from metrics import Counter
+
+# Peer cache per akun, supaya update dari grup aktif tidak hilang karena "Peer id invalid".
+#   - startup: access hash dari Mongo (chatrep_peers) dimasukkan ke storage pyrogram,
+#     lalu semua grup aktif di-resolve dalam batch dengan konkurensi terbatas;
+#     yang masih gagal di-resolve lewat satu kali scan dialog
+#   - hasilnya disimpan balik ke Mongo, jadi session string (in-memory) tidak mulai dari nol
+#   - update yang gagal karena peer belum dikenal: peer-nya di-resolve dulu, lalu update
+#     diproses ulang (bukan dibuang); update lain di batch yang sama yang sudah masuk
+#     antrian dispatcher tidak dikirim dua kali (pending)
+#
+# Catatan: pyrogram 2.0.106 menganggap id channel baru (< -1002147483647) tidak valid
+# waktu resolve; batasnya dilebarkan lewat widen_channel_range().
+
+# batas bawah id channel yang dipakai pyrogram versi baru
+MIN_CHANNEL_ID = -1009999999999
+
+UPDATES_RETRIED = Counter("chatrep_updates_retried_total", "Update yang diproses ulang setelah peer di-resolve")
+UPDATES_SKIPPED = Counter("chatrep_updates_skipped_total", "Update yang dibuang karena peer tidak bisa di-resolve")
+
+PeerRow = Tuple[int, int, str, Optional[str], Optional[str]]
+
+
+def widen_channel_range():
+    if utils.MIN_CHANNEL_ID > MIN_CHANNEL_ID:
+        utils.MIN_CHANNEL_ID = MIN_CHANNEL_ID
+
+
+def update_channel_id(update) -> Optional[int]:
+    # id channel (format bot API) yang dirujuk satu update, seperti di Client.handle_updates
+    channel_id = getattr(getattr(getattr(update, "message", None), "peer_id", None), "channel_id", None) \
+        or getattr(update, "channel_id", None)
+    return utils.get_channel_id(channel_id) if channel_id else None
+
+
+def update_peer_ids(updates) -> Set[int]:
+    ids = set()
+    for update in getattr(updates, "updates", None) or [getattr(updates, "update", None)]:
+        peer_id = update_channel_id(update)
+        if peer_id is not None:
+            ids.add(peer_id)
+    return ids
+
+
+def read_peers(conn, ids: List[int]) -> List[Tuple[int, int, str, Optional[str]]]:
+    rows = []
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        rows += conn.execute(
+            f"SELECT id, access_hash, type, username FROM peers WHERE id IN ({','.join('?' * len(part))})",
+            part,
+        ).fetchall()
+    return rows
+
+
+class PeerCache:
+    def __init__(self, client, col=None, account: Optional[str] = None,
+                 concurrency: int = 8, batch: int = 50, dialog_refresh: float = 300,
+                 log: Callable[..., None] = print_log):
+        self.client = client
+        self.col = col
+        self.account = account
+        self.concurrency = concurrency
+        self.batch = batch
+        self.dialog_refresh = dialog_refresh
+        self.log = log
+        self.known: Set[int] = set()
+        self._dialogs_at = float("-inf")
+        self._dialog_lock = asyncio.Lock()
+        self.stats = {"loaded": 0, "resolved": 0, "failed": 0, "saved": 0, "retried": 0, "skipped": 0}
+
+    async def _has(self, peer_id: int) -> bool:
+        if peer_id in self.known:
+            return True
+        try:
+            await self.client.storage.get_peer_by_id(peer_id)
+        except KeyError:
+            return False
+        self.known.add(peer_id)
+        return True
+
+    async def load(self):
+        # access hash tersimpan -> storage pyrogram (client harus sudah start)
+        if self.col is None:
+            return
+        from pymongo.errors import PyMongoError
+        rows: List[PeerRow] = []
+        try:
+            async for doc in self.col.find({"account": self.account}):
+                rows.append((int(doc["peer_id"]), int(doc.get("access_hash") or 0), str(doc["type"]),
+                             doc.get("username"), None))
+        except PyMongoError as e:
+            self.log(WARN, "PEERS", "load failed", err=str(e))
+            return
+        if rows:
+            await self.client.storage.update_peers(rows)
+            self.known.update(r[0] for r in rows)
+        self.stats["loaded"] = len(rows)
+
+    async def save(self, peer_ids: Iterable[int]):
+        if self.col is None:
+            return
+        from pymongo import UpdateOne
+        from pymongo.errors import PyMongoError
+        # ribuan grup aktif = query SQLite yang lumayan: jalan di thread, bukan di event loop
+        # (koneksi storage pyrogram dibuka dengan check_same_thread=False)
+        rows = await asyncio.to_thread(read_peers, self.client.storage.conn, list(peer_ids))
+        if not rows:
+            return
+        ops = [
+            UpdateOne({"account": self.account, "peer_id": pid},
+                      {"$set": {"access_hash": ah, "type": typ, "username": un, "updated_at": time.time()}},
+                      upsert=True)
+            for pid, ah, typ, un in rows
+        ]
+        try:
+            await self.col.bulk_write(ops, ordered=False)
+        except PyMongoError as e:
+            self.log(WARN, "PEERS", "save failed", err=str(e))
+            return
+        self.stats["saved"] += len(ops)
+
+    async def refresh_dialogs(self, force: bool = False) -> bool:
+        # scan dialog mengisi storage dengan access hash semua chat; dibatasi sekali per dialog_refresh
+        async with self._dialog_lock:
+            if not force and time.monotonic() - self._dialogs_at < self.dialog_refresh:
+                return False
+            self._dialogs_at = time.monotonic()
+            try:
+                async for _dialog in self.client.get_dialogs():
+                    pass
+            except (RPCError, ConnectionError, OSError) as e:
+                self.log(WARN, "PEERS", "dialog scan failed", err=str(e))
+                return False
+            return True
+
+    async def _resolve(self, peer_id: int, sem: asyncio.Semaphore) -> bool:
+        async with sem:
+            if await self._has(peer_id):
+                return True
+            try:
+                await self.client.resolve_peer(peer_id)
+            except (RPCError, KeyError, ValueError, ConnectionError, OSError):
+                return False
+            self.known.add(peer_id)
+            self.stats["resolved"] += 1
+            return True
+
+    async def warm(self, chat_ids: Iterable[int]):
+        ids = list(chat_ids)
+        t0 = time.perf_counter()
+        sem = asyncio.Semaphore(self.concurrency)
+        failed: List[int] = []
+        for i in range(0, len(ids), self.batch):
+            part = ids[i:i + self.batch]
+            ok = await asyncio.gather(*(self._resolve(pid, sem) for pid in part))
+            failed += [pid for pid, good in zip(part, ok) if not good]
+        if failed and await self.refresh_dialogs(force=True):
+            failed = [pid for pid in failed if not await self._has(pid)]
+        self.stats["failed"] = len(failed)
+        await self.save(ids)
+        self.log(INFO, "PEERS", "warmup", resolved=len(ids) - len(failed), chats=len(ids),
+                 seconds=round(time.perf_counter() - t0, 2), failed=len(failed))
+
+    async def pending(self, updates):
+        # Updates/UpdatesCombined diproses berurutan: update sebelum update pertama yang peer-nya
+        # belum dikenal sudah masuk antrian dispatcher, jadi yang diproses ulang cuma sisanya.
+        # None kalau tidak ada peer yang hilang (tidak jelas update mana yang gagal)
+        batch = getattr(updates, "updates", None)
+        if not batch:
+            return updates
+        for i, update in enumerate(batch):
+            peer_id = update_channel_id(update)
+            if peer_id is not None and not await self._has(peer_id):
+                if i == 0:
+                    return updates
+                rest = copy.copy(updates)
+                rest.updates = batch[i:]
+                return rest
+        return None
+
+    async def recover(self, updates) -> bool:
+        # True kalau semua peer yang dirujuk update sekarang ada di storage (layak diproses ulang)
+        ids = update_peer_ids(updates)
+        if not ids:
+            return False
+        missing = [pid for pid in ids if not await self._has(pid)]
+        if missing:
+            await self.refresh_dialogs()
+            for pid in missing:
+                if not await self._has(pid):
+                    return False
+            await self.save(missing)
+        return True
@@ -0,0 +1,110 @@
+import random
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+# Rotasi balasan per (chat, trigger): daftar response diacak sekali jadi "bag",
+# lalu diambil berurutan sampai habis dan diisi ulang. Jadi balasan yang sama tidak
+# keluar beruntun, dan tiap pick cuma increment index (tanpa retry random).
+#
+# Response boleh berbobot: ("teks", 3) muncul 3x dalam satu bag (bobot dihitung
+# sekali waktu rules dibekukan, lihat matcher.freeze).
+# Bag disimpan sebagai array('H') [pos, n, idx0, idx1, ...] (2 byte per slot).
+# Store dibatasi jumlah key + idle TTL dengan pola OrderedDict yang sama seperti
+# CooldownStore, jadi memori tetap terbatas walaupun chat-nya ribuan.
+
+# bobot di-scale supaya satu bag tidak lebih panjang dari ini
+MAX_BAG = 64
+
+Response = Union[str, Tuple[str, int]]
+
+
+def weights_of(responses: Sequence[Response]) -> Tuple[int, ...]:
+    weights = []
+    for item in responses:
+        w = item[1] if isinstance(item, (list, tuple)) and len(item) > 1 else 1
+        try:
+            w = int(w)
+        except (TypeError, ValueError):
+            w = 1
+        weights.append(max(0, w))
+    total = sum(weights)
+    if total > MAX_BAG:
+        # scale turun, tapi response berbobot > 0 tetap minimal sekali
+        weights = [max(1, w * MAX_BAG // total) if w else 0 for w in weights]
+    return tuple(weights)
+
+
+def build_bag(weights: Sequence[int], last: int = -1, rnd: random.Random = random) -> array:
+    slots = [i for i, w in enumerate(weights) for _ in range(w)]
+    rnd.shuffle(slots)
+    # sambungan antar bag: jangan mulai dengan balasan terakhir bag sebelumnya
+    if len(slots) > 1 and slots[0] == last:
+        for j in range(1, len(slots)):
+            if slots[j] != last:
+                slots[0], slots[j] = slots[j], slots[0]
+                break
+    return array("H", [0, len(weights)] + slots)
+
+
+class RotationStore:
+    def __init__(self, max_keys: int = 100_000, idle_ttl: float = 3600,
+                 clock: Callable[[], float] = time.monotonic, rnd: Optional[random.Random] = None):
+        self.max_keys = int(max_keys)
+        self.idle_ttl = float(idle_ttl)
+        self.clock = clock
+        self.rnd = rnd or random.Random()
+        self._bags: "OrderedDict[Hashable, Tuple[float, array]]" = OrderedDict()
+        self.refills = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._bags)
+
+    def _purge(self, now: float):
+        bags = self._bags
+        deadline = now - self.idle_ttl
+        while bags:
+            key, (ts, _bag) = next(iter(bags.items()))
+            if ts > deadline:
+                break
+            del bags[key]
+            self.expired += 1
+
+    def pick(self, key: Hashable, responses: Sequence[str],
+             weights: Optional[Sequence[int]] = None) -> str:
+        n = len(responses)
+        if n == 0:
+            return ""
+        if n == 1:
+            return responses[0] if weights is None or weights[0] else ""
+        now = self.clock()
+        entry = self._bags.get(key)
+        bag = entry[1] if entry is not None else None
+        last = -1
+        if bag is not None and bag[1] != n:
+            bag = None  # rules berubah, isi response beda -> bag lama tidak valid
+        if bag is not None and bag[0] >= len(bag) - 2:
+            last = bag[-1]
+            bag = None
+        if bag is None:
+            bag = build_bag(weights or (1,) * n, last, self.rnd)
+            if len(bag) == 2:  # semua bobot 0
+                return ""
+            self.refills += 1
+        idx = bag[bag[0] + 2]
+        bag[0] += 1
+        self._bags[key] = (now, bag)
+        self._bags.move_to_end(key)
+        self._purge(now)
+        while len(self._bags) > self.max_keys:
+            self._bags.popitem(last=False)
+            self.evictions += 1
+        return responses[idx]
+
+    def stats(self) -> Dict[str, int]:
+        self._purge(self.clock())
+        return {"live": len(self._bags), "refills": self.refills,
+                "expired": self.expired, "evictions": self.evictions}
@@ -0,0 +1,166 @@
+import asyncio
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from logpipe import INFO, WARN, print_log
+from matcher import RuleMatcher
+
+# pymongo di-import di dalam fungsi: baru ter-load bersama motor di open_mongo(), bukan di import startup
+
+# Rules disimpan di Mongo (collection chatrep_rules), format dokumen:
+#   {"trigger": str, "response": str | list[str | [str, weight]], "mode": "contains"|"exact"|"word"|"regex",
+#    "order": int, "enabled": bool}
+# Perubahan diikuti lewat change stream; kalau mongod bukan replica set, fallback ke polling.
+# Handler selalu baca self.matcher sekali per pesan, dan snapshot baru diganti utuh
+# (satu assignment), jadi pesan yang sedang diproses tetap pakai snapshot lama.
+# Event change stream digabung: rebuild jalan swap_delay detik setelah event pertama,
+# jadi edit massal (import rules, script) tidak membangun ulang automaton per dokumen.
+# Seed default memakai _id tetap ("default:<order>"): instance yang boot bersamaan dan
+# sama-sama melihat collection kosong tidak menggandakan rules (duplikat _id diabaikan).
+
+# E11000 duplicate key
+DUPLICATE_KEY = 11000
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED = (40573,)
+
+Entry = Tuple[Tuple[int, str], Tuple]
+
+
+class RuleStore:
+    def __init__(self, col, defaults: Sequence[Tuple], poll_seconds: float = 30,
+                 swap_delay: float = 0.5, log: Callable[..., None] = print_log):
+        self.col = col
+        self.defaults = tuple(defaults)
+        self.poll_seconds = poll_seconds
+        self.swap_delay = swap_delay
+        self.log = log
+        self.entries: Dict[Any, Entry] = {}
+        self.version = 0
+        self._matcher: Optional[RuleMatcher] = None
+        # rebuild yang dijadwalkan apply_change (None = tidak ada)
+        self._swap_handle: Optional[asyncio.TimerHandle] = None
+
+    def compile_defaults(self) -> RuleMatcher:
+        # dipanggil saat startup (boleh di thread), paralel dengan koneksi Mongo;
+        # load() nanti memakai ulang automaton-nya lewat patched()
+        if self._matcher is None:
+            self._matcher = RuleMatcher(self.defaults)
+        return self._matcher
+
+    @property
+    def matcher(self) -> RuleMatcher:
+        # compile_defaults belum jalan: compile sekarang
+        matcher = self._matcher
+        return matcher if matcher is not None else self.compile_defaults()
+
+    @staticmethod
+    def _entry(doc: dict) -> Optional[Entry]:
+        if not doc.get("enabled", True):
+            return None
+        trigger = str(doc.get("trigger") or "")
+        response = doc.get("response") or ""
+        if isinstance(response, list):
+            # item ["teks", bobot] -> balasan berbobot (lihat rotation.py)
+            response = tuple((str(r[0]), r[1] if len(r) > 1 else 1) if isinstance(r, list) and r else str(r)
+                             for r in response)
+        mode = str(doc.get("mode") or "contains")
+        return (int(doc.get("order", 0)), str(doc["_id"])), (trigger, response, mode)
+
+    def _swap(self):
+        if self._swap_handle is not None:
+            self._swap_handle.cancel()
+            self._swap_handle = None
+        rules = [rule for _key, rule in sorted(self.entries.values(), key=lambda e: e[0])]
+        self._matcher = self.matcher.patched(rules)
+        self.version += 1
+        self.log(INFO, "RULES", "loaded", version=self.version, rules=len(rules))
+        for idx, trigger, err in self.matcher.invalid:
+            self.log(WARN, "RULES", "regex rule dilewati", index=idx, trigger=trigger, err=str(err))
+
+    async def _fetch(self) -> Dict[Any, Entry]:
+        entries = {}
+        async for doc in self.col.find({}):
+            entry = self._entry(doc)
+            if entry is not None:
+                entries[doc["_id"]] = entry
+        return entries
+
+    async def _seed(self):
+        from pymongo.errors import BulkWriteError
+        docs = [
+            {"_id": f"default:{i}", "trigger": t, "response": list(r) if isinstance(r, (list, tuple)) else r,
+             "mode": mode, "order": i, "enabled": True}
+            for i, (t, r, mode) in enumerate(self.defaults)
+        ]
+        try:
+            await self.col.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # instance lain seed duluan: duplikat _id diabaikan, error lain diteruskan
+            if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", ())):
+                raise
+            inserted = e.details.get("nInserted", 0)
+        else:
+            inserted = len(docs)
+        if inserted:
+            self.log(INFO, "RULES", "seeded default rules", rules=inserted)
+
+    async def load(self):
+        if not await self.col.count_documents({}, limit=1):
+            await self._seed()
+        self.entries = await self._fetch()
+        self._swap()
+
+    async def resync(self):
+        entries = await self._fetch()
+        if entries != self.entries:
+            self.entries = entries
+            self._swap()
+
+    def apply_change(self, change: dict):
+        if "documentKey" not in change:
+            return
+        key = change["documentKey"]["_id"]
+        doc = change.get("fullDocument")
+        entry = self._entry(doc) if doc is not None else None
+        if entry is None:
+            if self.entries.pop(key, None) is None:
+                return
+        elif self.entries.get(key) == entry:
+            return
+        else:
+            self.entries[key] = entry
+        if self._swap_handle is None:
+            self._swap_handle = asyncio.get_running_loop().call_later(self.swap_delay, self._swap)
+
+    async def watch(self):
+        from pymongo.errors import OperationFailure, PyMongoError
+        while True:
+            try:
+                async with self.col.watch(full_document="updateLookup") as stream:
+                    self.log(INFO, "RULES", "watching change stream")
+                    # event yang mungkin kelewat sebelum stream dibuka
+                    await self.resync()
+                    async for change in stream:
+                        if change.get("operationType") == "invalidate":
+                            # collection di-drop/rename: buka ulang stream + resync
+                            break
+                        self.apply_change(change)
+                continue
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    self.log(INFO, "RULES", "change stream not supported, polling instead")
+                    await self.poll()
+                    return
+                self.log(WARN, "RULES", "change stream error", err=str(e))
+            except PyMongoError as e:
+                self.log(WARN, "RULES", "change stream error", err=str(e))
+            await asyncio.sleep(self.poll_seconds)
+
+    async def poll(self):
+        from pymongo.errors import PyMongoError
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.resync()
+            except PyMongoError as e:
+                self.log(WARN, "RULES", "poll error", err=str(e))
@@ -0,0 +1,248 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from pyrogram.errors import FloodWait
+
+from logpipe import ERROR, WARN, print_log
+from metrics import (FLOODWAITS, FLOODWAIT_SECONDS, SEND_DROPPED, SEND_ERRORS, SEND_SECONDS, SEND_WAIT_SECONDS,
+                     TRIGGER_SENDS)
+
+# Outbound scheduler: semua balasan auto-reply lewat sini.
+#   - token bucket per chat + satu bucket global
+#   - FloodWait cuma mem-pause bucket chat yang kena, item di-retry
+#   - balasan yang pesan pemicunya sudah terlalu lama dibuang (stale)
+# Tiap chat yang punya antrian dilayani satu task; task selesai kalau antriannya kosong.
+# Jeda "manusia" (delay) tidak di-sleep di handler: item masuk satu heap, dan satu timer
+# loop (call_later ke item paling awal) memindahkannya ke antrian chat begitu waktunya tiba.
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    def wait_time(self) -> float:
+        now = self.clock()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+async def acquire(bucket: TokenBucket):
+    while True:
+        delay = bucket.wait_time()
+        if delay <= 0:
+            bucket.take()
+            return
+        await asyncio.sleep(delay)
+
+
+class Outgoing(NamedTuple):
+    chat_id: int
+    text: str
+    reply_to: Optional[int]
+    queued_at: float
+    expires_at: float
+    tag: str = ""
+    # output command (.menu / .rule): tidak kena max_pending_per_chat, tidak dihitung per trigger
+    command: bool = False
+
+
+class SendScheduler:
+    def __init__(self, client, chat_rate: float = 1 / 3, chat_burst: float = 2,
+                 global_rate: float = 5, global_burst: float = 10,
+                 max_age: float = 30, max_pending_per_chat: int = 3,
+                 clock: Callable[[], float] = time.monotonic,
+                 log: Callable[..., None] = print_log):
+        self.client = client
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_age = max_age
+        self.max_pending_per_chat = max_pending_per_chat
+        self.clock = clock
+        self.log = log
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock)
+        # urut dari yang paling lama tidak dipakai; bucket idle dibuang _evict_idle
+        self.buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self.queues: Dict[int, Deque[Outgoing]] = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.delayed: List[Tuple[float, int, tuple]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {
+            "sent": 0, "dropped_stale": 0, "dropped_overflow": 0, "errors": 0,
+            "floodwaits": 0, "floodwait_seconds": 0,
+            "wait_total": 0.0, "wait_max": 0.0,
+        }
+
+    def depth(self) -> int:
+        return len(self.delayed) + sum(len(q) for q in self.queues.values())
+
+    # msg_time: waktu pesan pemicu (wall clock, Message.date), buat hitung stale
+    # delay: jeda sebelum masuk antrian chat (detik), tanpa menahan pemanggil
+    # tag: label untuk metrics (trigger yang memicu balasan)
+    def submit(self, chat_id: int, text: str, reply_to: Optional[int] = None,
+               msg_time: Optional[float] = None, delay: float = 0.0, tag: str = ""):
+        if delay > 0:
+            due = self.clock() + delay
+            heapq.heappush(self.delayed, (due, next(self._seq), (chat_id, text, reply_to, msg_time, tag)))
+            if self.delayed[0][0] == due:
+                self._arm_timer()
+            return
+        self._enqueue(chat_id, text, reply_to, msg_time, tag)
+
+    def _arm_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.delayed:
+            delay = max(0.0, self.delayed[0][0] - self.clock())
+            self._timer = asyncio.get_running_loop().call_later(delay, self._fire_timer)
+
+    def _fire_timer(self):
+        self._timer = None
+        now = self.clock()
+        delayed = self.delayed
+        while delayed and delayed[0][0] <= now:
+            _due, _seq, args = heapq.heappop(delayed)
+            self._enqueue(*args)
+        self._arm_timer()
+
+    def _enqueue(self, chat_id: int, text: str, reply_to: Optional[int],
+                 msg_time: Optional[float], tag: str = ""):
+        now = self.clock()
+        # umur pesan dari wall clock, dipindah ke clock scheduler (monotonic)
+        born = now if msg_time is None else now - max(0.0, time.time() - msg_time)
+        q = self.queues.setdefault(chat_id, deque())
+        q.append(Outgoing(chat_id, text, reply_to, now, born + self.max_age, tag))
+        if len(q) > self.max_pending_per_chat:
+            self._trim(q)
+        self._wake(chat_id)
+
+    def _trim(self, q: Deque[Outgoing]):
+        # ketinggalan jauh: balasan paling lama dibuang, yang terbaru menang;
+        # chunk output command tetap di antrian
+        excess = sum(1 for item in q if not item.command) - self.max_pending_per_chat
+        if excess <= 0:
+            return
+        keep = []
+        for item in q:
+            if excess > 0 and not item.command:
+                excess -= 1
+                self.stats["dropped_overflow"] += 1
+                SEND_DROPPED.inc("overflow")
+            else:
+                keep.append(item)
+        q.clear()
+        q.extend(keep)
+
+    # output command panjang (mis. .menu) yang sudah dipecah: semua chunk masuk antrian
+    # berurutan, tidak dibuang _trim, dan batas umurnya diperpanjang sesuai rate per chat
+    def submit_many(self, chat_id: int, texts: List[str], reply_to: Optional[int] = None, tag: str = ""):
+        now = self.clock()
+        q = self.queues.setdefault(chat_id, deque())
+        for i, text in enumerate(texts):
+            q.append(Outgoing(chat_id, text, reply_to if i == 0 else None, now,
+                              now + self.max_age + i / self.chat_rate, tag, command=True))
+        self._wake(chat_id)
+
+    def _wake(self, chat_id: int):
+        if chat_id not in self.tasks and self.queues.get(chat_id):
+            self.tasks[chat_id] = asyncio.create_task(self._serve(chat_id))
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        b = self.buckets.get(chat_id)
+        if b is None:
+            b = self.buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, self.clock)
+        return b
+
+    async def _serve(self, chat_id: int):
+        q = self.queues[chat_id]
+        bucket = self._bucket(chat_id)
+        try:
+            while q:
+                delay = bucket.wait_time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                item = q.popleft()
+                # stale dicek sebelum token dipakai: balasan basi tidak menghabiskan jatah chat
+                if self.clock() > item.expires_at:
+                    self.stats["dropped_stale"] += 1
+                    SEND_DROPPED.inc("stale")
+                    continue
+                bucket.take()
+                await acquire(self.global_bucket)
+                t0 = time.perf_counter()
+                try:
+                    await self.client.send_message(chat_id, item.text, reply_to_message_id=item.reply_to)
+                except FloodWait as e:
+                    wait = int(e.value) + 1
+                    bucket.pause(wait)
+                    q.appendleft(item)
+                    self.stats["floodwaits"] += 1
+                    self.stats["floodwait_seconds"] += wait
+                    FLOODWAITS.inc()
+                    FLOODWAIT_SECONDS.inc(n=wait)
+                    self.log(WARN, "SEND", "floodwait", chat=chat_id, wait=wait, pending=len(q))
+                    continue
+                except Exception as e:
+                    # RPCError / koneksi putus / bug parsing pyrogram (ValueError, TypeError, ...):
+                    # item ini dibuang, antrian chat tetap dikuras
+                    self.stats["errors"] += 1
+                    SEND_ERRORS.inc()
+                    self.log(ERROR, "SEND", "send failed", chat=chat_id, err=f"{type(e).__name__}: {e}")
+                    continue
+                SEND_SECONDS.observe(time.perf_counter() - t0)
+                if not item.command:
+                    TRIGGER_SENDS.inc(item.tag)
+                waited = self.clock() - item.queued_at
+                self.stats["sent"] += 1
+                self.stats["wait_total"] += waited
+                self.stats["wait_max"] = max(self.stats["wait_max"], waited)
+                SEND_WAIT_SECONDS.observe(waited)
+        finally:
+            self.tasks.pop(chat_id, None)
+            if not q:
+                self.queues.pop(chat_id, None)
+            if chat_id in self.buckets:
+                self.buckets.move_to_end(chat_id)
+            self._evict_idle()
+
+    def _evict_idle(self):
+        # bucket yang tidak dipakai selama waktu isi penuh (burst / rate) sama dengan bucket baru
+        idle = self.chat_burst / self.chat_rate
+        now = self.clock()
+        buckets = self.buckets
+        while buckets:
+            chat_id, b = next(iter(buckets.items()))
+            if chat_id in self.tasks or now - b.updated < idle or now < b.paused_until:
+                break
+            del buckets[chat_id]
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        tasks = list(self.tasks.values())
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
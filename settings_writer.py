@@ -0,0 +1,90 @@
+import asyncio
+from typing import Callable, Dict, Optional, Tuple
+
+from logpipe import DEBUG, ERROR, print_log
+
+# Write-behind untuk chatrep_settings: update per chat_id digabung di memori,
+# lalu di-flush jadi satu bulk_write kalau sudah max_batch chat atau tiap flush_interval.
+# Cache in-memory (active_chat_ids) diupdate langsung oleh pemanggil, jadi baca tetap konsisten.
+# Dokumen di-key (account, chat_id); account None = akun default.
+
+Key = Tuple[Optional[str], int]
+
+
+class SettingsWriter:
+    def __init__(self, col, max_batch: int = 200, flush_interval: float = 1.0,
+                 log: Callable[..., None] = print_log):
+        self.col = col
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.log = log
+        self.pending: Dict[Key, dict] = {}
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: "asyncio.Task | None" = None
+        self._closing = False
+        self.flushed = 0
+
+    def put(self, chat_id: int, fields: dict, account: Optional[str] = None):
+        self.pending.setdefault((account, int(chat_id)), {}).update(fields)
+        if len(self.pending) >= self.max_batch:
+            self._wake.set()
+
+    def _requeue(self, batch: Dict[Key, dict]):
+        # update yang lebih baru tetap menang
+        for key, fields in batch.items():
+            self.pending[key] = {**fields, **self.pending.get(key, {})}
+
+    async def flush(self):
+        async with self._lock:
+            # col None: Mongo belum tersambung (boot dari snapshot), pending tetap ditahan
+            if not self.pending or self.col is None:
+                return
+            from pymongo import UpdateOne
+            batch, self.pending = self.pending, {}
+            ops = [
+                UpdateOne({"account": account, "chat_id": chat_id},
+                          {"$set": {"account": account, "chat_id": chat_id, **fields}}, upsert=True)
+                for (account, chat_id), fields in batch.items()
+            ]
+            try:
+                await self.col.bulk_write(ops, ordered=False)
+            except asyncio.CancelledError:
+                self._requeue(batch)
+                raise
+            except Exception as e:
+                # apa pun error-nya batch tidak dibuang: dicoba lagi di flush berikutnya
+                self._requeue(batch)
+                self.log(ERROR, "DB", "settings flush failed", chats=len(ops), err=str(e))
+                return
+            self.flushed += len(ops)
+            self.log(DEBUG, "DB", "settings flushed", chats=len(ops))
+
+    async def _run(self):
+        # _closing: di 3.11 wait_for bisa menelan cancel kalau wake & cancel datang bersamaan,
+        # loop tetap berhenti lewat flag ini
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # shield: close() yang meng-cancel loop ini tidak memutus bulk_write yang sedang jalan
+            await asyncio.shield(self.flush())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._closing = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._closing = False
+        # flush terakhir menunggu lock: flush yang masih jalan selesai dulu, lalu sisanya ditulis
+        await self.flush()
@@ -0,0 +1,98 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+# Snapshot lokal (SQLite) untuk warm restart: grup aktif + overlay rules per grup +
+# cooldown yang belum lewat, per akun. Ditulis berkala dan saat shutdown, dibaca sync
+# saat boot supaya handler bisa jalan sebelum Mongo tersambung; Mongo tetap sumber
+# kebenaran (reload_enabled di background menimpa isi snapshot).
+#
+# Ditulis ke file .tmp lalu os.replace: file lama tetap utuh kalau proses mati di tengah.
+# Penulisan diserialkan (_WRITE_LOCK): tulis berkala di thread yang masih jalan saat shutdown
+# ditunggu dulu, jadi .tmp tidak dipakai berdua dan snapshot shutdown yang terakhir menang.
+# Cooldown disimpan sebagai waktu wall clock (until) dengan trigger normalized, bukan
+# rule.id: monotonic clock dan id rule tidak sama antar proses.
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE chats (account TEXT, chat_id INTEGER, rules TEXT, PRIMARY KEY (account, chat_id));
+CREATE TABLE cooldowns (account TEXT, chat_id INTEGER, trigger TEXT, until REAL);
+"""
+
+_WRITE_LOCK = threading.Lock()
+
+
+class AccountSnapshot(NamedTuple):
+    active: Set[int]
+    # chat_id -> dokumen "rules" (overlay_doc), hanya grup yang punya overlay
+    overlays: Dict[int, dict]
+    # (chat_id, trigger normalized, sisa detik)
+    cooldowns: List[Tuple[int, str, float]]
+
+
+def save_snapshot(path: str, accounts: Dict[Optional[str], AccountSnapshot], now: Optional[float] = None):
+    with _WRITE_LOCK:
+        _write(path, accounts, time.time() if now is None else now)
+
+
+def _write(path: str, accounts: Dict[Optional[str], AccountSnapshot], now: float):
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    con = sqlite3.connect(tmp)
+    try:
+        con.executescript(SCHEMA)
+        with con:
+            con.execute("INSERT INTO meta VALUES ('saved_at', ?)", (repr(now),))
+            for key, snap in accounts.items():
+                acc = key or ""
+                con.executemany(
+                    "INSERT INTO chats VALUES (?, ?, ?)",
+                    ((acc, c, json.dumps(snap.overlays[c]) if c in snap.overlays else None)
+                     for c in snap.active),
+                )
+                con.executemany(
+                    "INSERT INTO cooldowns VALUES (?, ?, ?, ?)",
+                    ((acc, c, trig, now + left) for c, trig, left in snap.cooldowns if left > 0),
+                )
+    finally:
+        con.close()
+    os.replace(tmp, path)
+
+
+# {} kalau file tidak ada, rusak, atau lebih tua dari max_age detik (0 = tanpa batas)
+def load_snapshot(path: str, max_age: float = 0, now: Optional[float] = None) -> Dict[Optional[str], AccountSnapshot]:
+    now = time.time() if now is None else now
+    if not os.path.exists(path):
+        return {}
+    out: Dict[Optional[str], AccountSnapshot] = {}
+
+    def get(key: str) -> AccountSnapshot:
+        key = key or None
+        if key not in out:
+            out[key] = AccountSnapshot(set(), {}, [])
+        return out[key]
+
+    try:
+        con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = con.execute("SELECT value FROM meta WHERE key = 'saved_at'").fetchone()
+            if row is None or (max_age and now - float(row[0]) > max_age):
+                return {}
+            for acc, chat_id, rules in con.execute("SELECT account, chat_id, rules FROM chats"):
+                snap = get(acc)
+                snap.active.add(int(chat_id))
+                if rules:
+                    snap.overlays[int(chat_id)] = json.loads(rules)
+            for acc, chat_id, trig, until in con.execute(
+                    "SELECT account, chat_id, trigger, until FROM cooldowns WHERE until > ? ORDER BY until",
+                    (now,)):
+                get(acc).cooldowns.append((int(chat_id), trig, until - now))
+        finally:
+            con.close()
+    except (sqlite3.Error, ValueError):
+        return {}
+    return out
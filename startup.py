@@ -0,0 +1,44 @@
+import time
+from typing import Awaitable, List, Tuple, TypeVar
+
+# Profil waktu startup per fase (STARTUP_PROFILE=1 di .env untuk mencetak laporannya).
+# Fase berurutan dicatat dengan mark() (dari akhir fase sebelumnya sampai sekarang);
+# fase yang jalan paralel dicatat dengan timed(), dan mark() berikutnya mulai dari
+# fase paralel yang paling akhir selesai.
+# Titik nol = saat modul ini pertama di-import (paling awal di main.py).
+
+T = TypeVar("T")
+
+
+class StartupProfile:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.t0 = clock()
+        self.last = self.t0
+        self.phases: List[Tuple[str, float, float]] = []
+
+    def mark(self, name: str) -> float:
+        now = self.clock()
+        self.phases.append((name, self.last, now))
+        self.last = now
+        return now - self.t0
+
+    async def timed(self, name: str, aw: Awaitable[T]) -> T:
+        start = self.clock()
+        try:
+            return await aw
+        finally:
+            end = self.clock()
+            self.phases.append((name, start, end))
+            self.last = max(self.last, end)
+
+    def report(self) -> str:
+        width = max((len(name) for name, _s, _e in self.phases), default=0)
+        lines = ["[STARTUP] phase timings (start +duration):"]
+        for name, start, end in self.phases:
+            lines.append(f"  {name:<{width}}  {(start - self.t0) * 1000:8.1f}ms  +{(end - start) * 1000:8.1f}ms")
+        lines.append(f"  {'total':<{width}}  {(self.last - self.t0) * 1000:8.1f}ms")
+        return "\n".join(lines)
+
+
+PROFILE = StartupProfile()
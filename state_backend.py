@@ -0,0 +1,125 @@
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from logpipe import INFO, WARN, print_log
+
+# Backend state cooldown / grup aktif.
+#   memory: default, semua state lokal di proses (perilaku lama)
+#   mongo : beberapa instance berbagi state lewat Mongo
+#     - cooldown di-claim atomik (find_one_and_update + upsert pada _id yang sama)
+#     - perubahan chatrep_settings (enabled + overlay rules) diikuti change stream (fallback polling);
+#       dokumen yang dihapus = grup OFF (event delete cuma membawa _id: kalau _id-nya belum pernah
+#       terlihat di stream, state di-resync penuh)
+# Cache lokal tetap di depan: CooldownStore per akun menolak duplikat tanpa network,
+# dan cek grup aktif selalu dari set in-memory. Network cuma dipakai saat mau kirim.
+# pymongo.errors di-import di dalam method (lazy, lihat rules_store.py)
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED = (40573,)
+
+EnabledCallback = Callable[[Optional[str], int, bool, Optional[dict]], None]
+
+
+class MemoryBackend:
+    shared = False
+
+    async def setup(self):
+        pass
+
+    async def claim_cooldown(self, account: Optional[str], chat_id: int, trigger: str, ttl: float) -> bool:
+        return True
+
+    async def watch_enabled(self, on_change: EnabledCallback, resync: Callable[[], Awaitable[None]]):
+        pass
+
+
+class MongoBackend:
+    shared = True
+
+    def __init__(self, db, settings_col, poll_seconds: float = 30,
+                 log: Callable[..., None] = print_log):
+        self.cooldowns = db["chatrep_cooldowns"]
+        self.settings_col = settings_col
+        self.poll_seconds = poll_seconds
+        self.log = log
+        self.instance = f"{socket.gethostname()}:{os.getpid()}"
+        self.claims = 0
+        self.lost_claims = 0
+        # _id dokumen chatrep_settings -> (account, chat_id), dari event yang sudah lewat
+        self._settings_keys: Dict[Any, Tuple[Optional[str], int]] = {}
+
+    async def setup(self):
+        # dokumen cooldown dibersihkan Mongo sendiri setelah expire
+        await self.cooldowns.create_index("expires_at", expireAfterSeconds=0)
+
+    async def claim_cooldown(self, account: Optional[str], chat_id: int, trigger: str, ttl: float) -> bool:
+        from pymongo.errors import DuplicateKeyError, PyMongoError
+        now = time.time()
+        key = f"{account or ''}:{chat_id}:{trigger}"
+        try:
+            # filter cuma cocok kalau cooldown sudah lewat; kalau masih aktif, upsert
+            # mencoba insert _id yang sama dan gagal DuplicateKeyError -> instance lain menang
+            await self.cooldowns.find_one_and_update(
+                {"_id": key, "until": {"$lte": now}},
+                {"$set": {
+                    "until": now + ttl,
+                    "by": self.instance,
+                    "expires_at": datetime.fromtimestamp(now + ttl, timezone.utc),
+                }},
+                upsert=True,
+                projection={"_id": 1},
+            )
+        except DuplicateKeyError:
+            self.lost_claims += 1
+            return False
+        except PyMongoError as e:
+            # Mongo bermasalah: jangan blok balasan, cukup cooldown lokal
+            self.log(WARN, "STATE", "cooldown claim failed", err=str(e))
+            return True
+        self.claims += 1
+        return True
+
+    async def watch_enabled(self, on_change: EnabledCallback, resync: Callable[[], Awaitable[None]]):
+        from pymongo.errors import OperationFailure, PyMongoError
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        while True:
+            try:
+                async with self.settings_col.watch(pipeline, full_document="updateLookup") as stream:
+                    self.log(INFO, "STATE", "watching chatrep_settings")
+                    await resync()
+                    async for change in stream:
+                        if change.get("operationType") == "delete":
+                            key = self._settings_keys.pop(change["documentKey"]["_id"], None)
+                            if key is not None:
+                                on_change(key[0], key[1], False, None)
+                            else:
+                                await resync()
+                            continue
+                        doc = change.get("fullDocument")
+                        if doc and "chat_id" in doc:
+                            self._settings_keys[doc["_id"]] = (doc.get("account"), int(doc["chat_id"]))
+                            on_change(doc.get("account"), int(doc["chat_id"]), bool(doc.get("enabled")),
+                                      doc.get("rules"))
+                continue
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    self.log(INFO, "STATE", "change stream not supported, polling chatrep_settings")
+                    await self._poll(resync)
+                    return
+                self.log(WARN, "STATE", "settings stream error", err=str(e))
+            except PyMongoError as e:
+                self.log(WARN, "STATE", "settings stream error", err=str(e))
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _poll(self, resync: Callable[[], Awaitable[None]]):
+        from pymongo.errors import PyMongoError
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await resync()
+            except PyMongoError as e:
+                self.log(WARN, "STATE", "settings poll error", err=str(e))
@@ -0,0 +1,86 @@
+import argparse
+import json
+import multiprocessing as mp
+import time
+from typing import List
+
+# Mode supervisor: banyak akun userbot dalam beberapa proses worker.
+# Tiap worker menjalankan banyak Client di satu event loop dan berbagi satu Motor
+# client + satu snapshot rules; cooldown dan grup aktif tetap per akun (main.Account).
+#
+#   python supervisor.py sessions.json --workers 4
+#
+# sessions.json: list of {"name": ..., "session_string": ..., "api_id"?: ..., "api_hash"?: ...,
+#                         "workdir"?: ..., "key"?: ...}
+
+RESTART_BACKOFF = (1, 2, 5, 10, 30)
+
+
+def load_sessions(path: str) -> List[dict]:
+    from config import API_ID, API_HASH
+    with open(path, encoding="utf-8") as f:
+        sessions = json.load(f)
+    names = [s["name"] for s in sessions]
+    if len(set(names)) != len(names):
+        raise SystemExit("nama session di sessions file harus unik")
+    # api_id / api_hash boleh per session; .env cuma wajib untuk session yang tidak mengisinya
+    missing = [s["name"] for s in sessions
+               if not (s.get("api_id") or API_ID) or not (s.get("api_hash") or API_HASH)]
+    if missing:
+        raise SystemExit(f"api_id / api_hash belum diset (session: {', '.join(missing)})")
+    return sessions
+
+
+def shard(sessions: List[dict], workers: int) -> List[List[dict]]:
+    workers = max(1, workers)
+    shards = [sessions[i::workers] for i in range(workers)]
+    return [s for s in shards if s]
+
+
+def worker(index: int, configs: List[dict]):
+    import main  # import di proses anak: Motor client + rules dibuat per proses
+    main.run_worker(index, configs)
+
+
+def supervise(sessions: List[dict], workers: int):
+    ctx = mp.get_context("spawn")
+    shards = shard(sessions, workers)
+    procs = {}
+    restarts = [0] * len(shards)
+
+    def spawn(i: int):
+        p = ctx.Process(target=worker, args=(i, shards[i]), name=f"chatrep-worker-{i}")
+        p.start()
+        procs[i] = (p, time.monotonic())
+
+    print(f"[SUPERVISOR] {len(sessions)} sessions over {len(shards)} workers")
+    for i in range(len(shards)):
+        spawn(i)
+    try:
+        while True:
+            time.sleep(1)
+            for i, (p, started) in list(procs.items()):
+                if p.is_alive():
+                    continue
+                # worker yang jalan lama dianggap sehat: backoff direset
+                if time.monotonic() - started > 60:
+                    restarts[i] = 0
+                delay = RESTART_BACKOFF[min(restarts[i], len(RESTART_BACKOFF) - 1)]
+                restarts[i] += 1
+                print(f"[SUPERVISOR] worker {i} exited (code={p.exitcode}), restart in {delay}s")
+                time.sleep(delay)
+                spawn(i)
+    except KeyboardInterrupt:
+        print("[SUPERVISOR] stopping workers...")
+        for p, _started in procs.values():
+            p.terminate()
+        for p, _started in procs.values():
+            p.join(timeout=15)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Jalankan banyak akun ChatRep dalam beberapa proses")
+    ap.add_argument("sessions", help="file JSON berisi daftar session")
+    ap.add_argument("--workers", type=int, default=mp.cpu_count(), help="jumlah proses worker")
+    args = ap.parse_args()
+    supervise(load_sessions(args.sessions), args.workers)